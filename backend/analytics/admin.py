@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import RentalCube
+
+
+@admin.register(RentalCube)
+class RentalCubeAdmin(admin.ModelAdmin):
+    list_display = ['day', 'category', 'city', 'duration_type', 'revenue', 'payments', 'rentals']
+    list_filter = ['duration_type', 'category', 'day']
+    search_fields = ['city']
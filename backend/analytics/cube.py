@@ -0,0 +1,152 @@
+"""
+Rental analytics cube.
+
+RentalCube stores one cell per (day, category, city, duration type) with the
+revenue from successful payments and the number of non-cancelled rentals.
+Signals (analytics.signals) apply every Payment and Subscription change to
+its cell as a delta, so queries slice and roll up a few pre-aggregated rows
+and never scan payments. Cells are keyed on the product's category and city;
+saving a product with a new category or city moves its counts to the new
+cells. Queryset updates skip the signals, so rebuild_cube() realigns the
+cells after products are moved that way.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+
+from rentkart_backend.counters import increment
+
+from .models import RentalCube
+
+
+DIMENSIONS = ('day', 'category', 'city', 'duration_type')
+MEASURES = ('revenue', 'payments', 'rentals')
+INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def bump(day, category_id, city, duration_type, **deltas):
+    """Add `deltas` to one cell, creating it if needed"""
+    cell = {'day': day, 'category_id': category_id, 'city': city or '', 'duration_type': duration_type}
+    increment(RentalCube, cell, **deltas)
+
+
+def record_payment(day, category_id, city, duration_type, amount, sign=1):
+    bump(day, category_id, city, duration_type, revenue=sign * amount, payments=sign)
+
+
+def record_rental(day, category_id, city, duration_type, sign=1):
+    bump(day, category_id, city, duration_type, rentals=sign)
+
+
+def query(group_by=(), interval='day', start_date=None, end_date=None, category=None, city=None, duration_type=None):
+    """
+    Measures rolled up to the `group_by` dimensions over the slice given by
+    the other arguments. With 'day' in `group_by`, `interval` buckets days
+    into weeks or months. Returns (rows, totals).
+    """
+    cells = RentalCube.objects.all()
+    if start_date:
+        cells = cells.filter(day__gte=start_date)
+    if end_date:
+        cells = cells.filter(day__lte=end_date)
+    if category is not None:
+        cells = cells.filter(category=category)
+    if city is not None:
+        cells = cells.filter(city__iexact=city)
+    if duration_type:
+        cells = cells.filter(duration_type=duration_type)
+
+    # Aggregate aliases can't reuse the field names
+    measures = {f'total_{measure}': Sum(measure) for measure in MEASURES}
+    totals = cells.aggregate(**measures)
+
+    columns = []
+    annotations = {}
+    for dimension in group_by:
+        if dimension == 'day' and INTERVALS[interval]:
+            annotations['period'] = INTERVALS[interval]('day')
+            columns.append('period')
+        elif dimension == 'day':
+            annotations['period'] = F('day')
+            columns.append('period')
+        elif dimension == 'category':
+            columns.extend(['category_id', 'category__name', 'category__slug'])
+        else:
+            columns.append(dimension)
+
+    rows = []
+    if group_by:
+        grouped = cells.annotate(**annotations).values(*columns).annotate(**measures).order_by(*columns)
+        for row in grouped:
+            out = {}
+            if 'period' in row:
+                out['period'] = row['period'].isoformat()
+            if 'category_id' in row:
+                out['category'] = {
+                    'id': row['category_id'], 'name': row['category__name'], 'slug': row['category__slug'],
+                }
+            for dimension in ('city', 'duration_type'):
+                if dimension in row:
+                    out[dimension] = row[dimension]
+            out.update(_measures(row))
+            rows.append(out)
+
+    return rows, _measures(totals)
+
+
+def _measures(row):
+    return {
+        'revenue': (row['total_revenue'] or Decimal('0')).quantize(Decimal('0.01')),
+        'payments': row['total_payments'] or 0,
+        'rentals': row['total_rentals'] or 0,
+    }
+
+
+def rebuild_cube():
+    """Recompute every cell from payments and subscriptions"""
+    from payments.models import Payment
+    from subscriptions.models import Subscription
+
+    cells = defaultdict(lambda: {'revenue': Decimal('0'), 'payments': 0, 'rentals': 0})
+
+    payments = (
+        Payment.objects.filter(status='success')
+        .annotate(day=TruncDate(Coalesce('payment_date', 'created_at')))
+        .values('day', 'subscription__product__category_id', 'subscription__product__city', 'subscription__duration_type')
+        .annotate(total=Sum('amount'), count=Count('pk'))
+        .order_by()
+    )
+    for row in payments:
+        cell = cells[
+            row['day'], row['subscription__product__category_id'],
+            row['subscription__product__city'], row['subscription__duration_type'],
+        ]
+        cell['revenue'] += row['total']
+        cell['payments'] += row['count']
+
+    rentals = (
+        Subscription.objects.filter(~Q(status='cancelled'))
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'product__category_id', 'product__city', 'duration_type')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for row in rentals:
+        cells[row['day'], row['product__category_id'], row['product__city'], row['duration_type']]['rentals'] += row['count']
+
+    with transaction.atomic():
+        RentalCube.objects.all().delete()
+        RentalCube.objects.bulk_create(
+            [RentalCube(day=day, category_id=category_id, city=city or '', duration_type=duration_type, **measures)
+             for (day, category_id, city, duration_type), measures in cells.items()],
+            batch_size=1000,
+        )
+    return len(cells)
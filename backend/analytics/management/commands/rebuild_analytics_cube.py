@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.cube import rebuild_cube
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the rental analytics cube from payments and subscriptions'
+
+    def handle(self, *args, **options):
+        cells = rebuild_cube()
+        self.stdout.write(self.style.SUCCESS(f'Analytics cube rebuilt ({cells} cells)'))
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.12 on 2026-10-18 13:00
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_cube(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Subscription = apps.get_model("subscriptions", "Subscription")
+    RentalCube = apps.get_model("analytics", "RentalCube")
+
+    cells = defaultdict(lambda: {"revenue": Decimal("0"), "payments": 0, "rentals": 0})
+    payments = Payment.objects.filter(status="success").values_list(
+        "payment_date",
+        "created_at",
+        "amount",
+        "subscription__product__category_id",
+        "subscription__product__city",
+        "subscription__duration_type",
+    )
+    for payment_date, created_at, amount, category_id, city, duration_type in payments:
+        day = timezone.localdate(payment_date or created_at)
+        cell = cells[day, category_id, city or "", duration_type]
+        cell["revenue"] += amount
+        cell["payments"] += 1
+
+    rentals = Subscription.objects.exclude(status="cancelled").values_list(
+        "created_at", "product__category_id", "product__city", "duration_type"
+    )
+    for created_at, category_id, city, duration_type in rentals:
+        cells[timezone.localdate(created_at), category_id, city or "", duration_type]["rentals"] += 1
+
+    RentalCube.objects.bulk_create(
+        [
+            RentalCube(
+                day=day, category_id=category_id, city=city, duration_type=duration_type, **measures
+            )
+            for (day, category_id, city, duration_type), measures in cells.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("payments", "0004_revenue_ledger"),
+        ("subscriptions", "0002_product_occupancy"),
+        ("products", "0008_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentalCube",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("city", models.CharField(blank=True, max_length=100)),
+                ("duration_type", models.CharField(max_length=20)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("payments", models.IntegerField(default=0)),
+                ("rentals", models.IntegerField(default=0)),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="cube_cells",
+                        to="products.category",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Rental cube cell",
+                "ordering": ["day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "category", "city", "duration_type"),
+                        name="unique_rental_cube_cell",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+from django.db import models
+from products.models import Category
+
+
+class RentalCube(models.Model):
+    """Revenue and rental counts per (day, category, city, duration type) - see analytics.cube"""
+    
+    day = models.DateField()
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, related_name='cube_cells')
+    city = models.CharField(max_length=100, blank=True)
+    duration_type = models.CharField(max_length=20)
+    
+    # Successful payments, by payment date
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    payments = models.IntegerField(default=0)
+    
+    # Subscriptions that are not cancelled, by creation date
+    rentals = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name = 'Rental cube cell'
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'category', 'city', 'duration_type'], name='unique_rental_cube_cell'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.day} {self.category_id} {self.city} {self.duration_type}"
@@ -0,0 +1,42 @@
+import uuid
+
+from rest_framework import serializers
+
+from products.models import Category
+
+from .cube import DIMENSIONS, INTERVALS
+
+
+class CubeQuerySerializer(serializers.Serializer):
+    group_by = serializers.CharField(required=False, default='')
+    interval = serializers.ChoiceField(choices=list(INTERVALS), default='day')
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    category = serializers.CharField(required=False)
+    city = serializers.CharField(required=False)
+    duration_type = serializers.ChoiceField(choices=['daily', 'weekly', 'monthly'], required=False)
+    
+    def validate_group_by(self, value):
+        dimensions = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in dimensions if name not in DIMENSIONS]
+        if unknown:
+            raise serializers.ValidationError(
+                f"Unknown dimension(s): {', '.join(unknown)}. Choose from {', '.join(DIMENSIONS)}"
+            )
+        return list(dict.fromkeys(dimensions))
+    
+    def validate_category(self, value):
+        # Accept either the category id or its slug
+        try:
+            lookup = {'pk': uuid.UUID(value)}
+        except ValueError:
+            lookup = {'slug': value}
+        category = Category.objects.filter(**lookup).first()
+        if category is None:
+            raise serializers.ValidationError("Category not found")
+        return category
+    
+    def validate(self, data):
+        if data.get('start_date') and data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must not be before start date")
+        return data
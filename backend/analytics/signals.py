@@ -0,0 +1,161 @@
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from payments.models import Payment
+from payments.rollups import local_day
+from products.models import Product
+from rentkart_backend import counters
+from subscriptions.models import Subscription
+from subscriptions.signals import statuses_changed
+
+from .cube import bump, record_payment, record_rental
+
+
+PAYMENT_CELL_FIELDS = (
+    'status', 'payment_date', 'created_at', 'amount',
+    'subscription__product__category_id', 'subscription__product__city', 'subscription__duration_type',
+)
+RENTAL_CELL_FIELDS = ('created_at', 'status', 'duration_type', 'product__category_id', 'product__city')
+PRODUCT_CELL_FIELDS = ('category_id', 'city')
+counters.track(Payment, *PAYMENT_CELL_FIELDS)
+counters.track(Subscription, *RENTAL_CELL_FIELDS)
+counters.track(Product, *PRODUCT_CELL_FIELDS)
+
+
+def _payment_cell(status, payment_date, created_at, amount, category_id, city, duration_type):
+    """The (cell..., amount) a payment adds to, or None if it isn't a success"""
+    if status != 'success' or category_id is None:
+        return None
+    return (local_day(payment_date or created_at), category_id, city or '', duration_type, amount)
+
+
+def _current_payment_cell(payment):
+    if payment.status != 'success':
+        return None
+    subscription = Subscription.objects.filter(pk=payment.subscription_id).values_list(
+        'product__category_id', 'product__city', 'duration_type'
+    ).first()
+    if subscription is None:
+        return None
+    return _payment_cell(payment.status, payment.payment_date, payment.created_at, payment.amount, *subscription)
+
+
+def _saved_payment_cell(values):
+    if values is None or values['status'] != 'success':
+        return None
+    return _payment_cell(*(values[field] for field in PAYMENT_CELL_FIELDS))
+
+
+@receiver(post_save, sender=Payment)
+def update_cube_revenue(sender, instance, **kwargs):
+    previous = _saved_payment_cell(counters.previous(instance))
+    current = _saved_payment_cell(counters.current(instance)) if instance.status == 'success' else None
+    if current == previous:
+        return
+    if previous:
+        record_payment(*previous, sign=-1)
+    if current:
+        record_payment(*current)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_cube_revenue(sender, instance, **kwargs):
+    cell = _current_payment_cell(instance)
+    if cell:
+        record_payment(*cell, sign=-1)
+
+
+def _rental_cell(created_at, status, duration_type, category_id, city):
+    """The cell a subscription counts in, or None if it is cancelled"""
+    if status == 'cancelled' or category_id is None:
+        return None
+    return (local_day(created_at), category_id, city or '', duration_type)
+
+
+def _current_rental_cell(subscription):
+    product = Product.objects.filter(pk=subscription.product_id).values_list('category_id', 'city').first()
+    if product is None:
+        return None
+    return _rental_cell(subscription.created_at, subscription.status, subscription.duration_type, *product)
+
+
+def _saved_rental_cell(values):
+    if values is None:
+        return None
+    return _rental_cell(*(values[field] for field in RENTAL_CELL_FIELDS))
+
+
+@receiver(post_save, sender=Subscription)
+def update_cube_rentals(sender, instance, **kwargs):
+    previous = _saved_rental_cell(counters.previous(instance))
+    current = _saved_rental_cell(counters.current(instance))
+    if current == previous:
+        return
+    if previous:
+        record_rental(*previous, sign=-1)
+    if current:
+        record_rental(*current)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_cube_rental(sender, instance, **kwargs):
+    cell = _current_rental_cell(instance)
+    if cell:
+        record_rental(*cell, sign=-1)
+
+
+@receiver(statuses_changed, sender=Subscription)
+def move_cube_rentals(sender, ids, previous, status, **kwargs):
+    """Only moves into or out of 'cancelled' change the rental counts"""
+    delta = (previous == 'cancelled') - (status == 'cancelled')
+    if not delta:
+        return
+    cells = (
+        Subscription.objects.filter(pk__in=ids, product__category__isnull=False)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'product__category_id', 'product__city', 'duration_type')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for cell in cells:
+        bump(
+            cell['day'], cell['product__category_id'], cell['product__city'], cell['duration_type'],
+            rentals=delta * cell['count'],
+        )
+
+
+@receiver(post_save, sender=Product)
+def move_cube_product(sender, instance, **kwargs):
+    """Move a product's revenue and rentals to its new category or city"""
+    previous = counters.previous(instance)
+    if previous is None:
+        return
+    old = (previous['category_id'], previous['city'] or '')
+    new = (instance.category_id, instance.city or '')
+    if old == new:
+        return
+    revenue = (
+        Payment.objects.filter(subscription__product=instance, status='success')
+        .annotate(day=TruncDate(Coalesce('payment_date', 'created_at')))
+        .values('day', 'subscription__duration_type')
+        .annotate(total=Sum('amount'), count=Count('pk'))
+        .order_by()
+    )
+    for cell in revenue:
+        for (category_id, city), sign in ((old, -1), (new, 1)):
+            bump(
+                cell['day'], category_id, city, cell['subscription__duration_type'],
+                revenue=sign * cell['total'], payments=sign * cell['count'],
+            )
+    rentals = (
+        Subscription.objects.filter(~Q(status='cancelled'), product=instance)
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'duration_type')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for cell in rentals:
+        for (category_id, city), sign in ((old, -1), (new, 1)):
+            bump(cell['day'], category_id, city, cell['duration_type'], rentals=sign * cell['count'])
@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('cube/', views.rental_cube, name='rental-cube'),
+]
@@ -0,0 +1,35 @@
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .cube import query
+from .serializers import CubeQuerySerializer
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def rental_cube(request):
+    """Admin: revenue and rentals sliced and rolled up by day, category, city and duration type"""
+    if not (request.user.is_superuser or request.user.role == 'admin'):
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    serializer = CubeQuerySerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    params = serializer.validated_data
+    
+    rows, totals = query(
+        group_by=params['group_by'],
+        interval=params['interval'],
+        start_date=params.get('start_date'),
+        end_date=params.get('end_date'),
+        category=params.get('category'),
+        city=params.get('city'),
+        duration_type=params.get('duration_type'),
+    )
+    return Response({
+        'group_by': params['group_by'],
+        'interval': params['interval'],
+        'rows': rows,
+        'totals': totals,
+    })
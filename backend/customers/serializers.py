@@ -1,9 +1,10 @@
 from rest_framework import serializers
 from .models import Customer, Address
 from users.serializers import UserSerializer
+from rentkart_backend.sparse_fields import SparseFieldsMixin
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Address
         fields = [
@@ -14,7 +15,9 @@ class AddressSerializer(serializers.ModelSerializer):
         read_only_fields = ['customer', 'created_at', 'updated_at']
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    sparse_params = True
+
     user_details = UserSerializer(source='user', read_only=True)
     addresses = AddressSerializer(many=True, read_only=True)
     
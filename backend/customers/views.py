@@ -4,9 +4,10 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from .models import Customer, Address
 from .serializers import CustomerSerializer, UpdateCustomerProfileSerializer, AddressSerializer
+from rentkart_backend.eager_loading import EagerLoadingViewMixin
 
 
-class CustomerListView(generics.ListCreateAPIView):
+class CustomerListView(EagerLoadingViewMixin, generics.ListCreateAPIView):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
     permission_classes = [IsAuthenticated]
@@ -22,7 +23,7 @@ def customer_profile_view(request):
         customer = Customer.objects.create(user=request.user)
     
     if request.method == 'GET':
-        serializer = CustomerSerializer(customer)
+        serializer = CustomerSerializer(customer, context={'request': request})
         return Response(serializer.data)
     
     elif request.method == 'PATCH':
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, Invoice
+from .models import Payment, Invoice, ReconciliationRun, ReconciliationIssue
 
 
 @admin.register(Payment)
@@ -16,3 +16,17 @@ class InvoiceAdmin(admin.ModelAdmin):
     list_filter = ['is_paid', 'invoice_date']
     search_fields = ['invoice_number', 'subscription__id']
     readonly_fields = ['invoice_number', 'gst_amount', 'total_amount', 'created_at']
+
+
+@admin.register(ReconciliationRun)
+class ReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = ['source', 'started_at', 'finished_at', 'dry_run', 'rows', 'matched', 'issues', 'corrected']
+    list_filter = ['dry_run', 'started_at']
+
+
+@admin.register(ReconciliationIssue)
+class ReconciliationIssueAdmin(admin.ModelAdmin):
+    list_display = ['run', 'kind', 'row', 'transaction_id', 'detail', 'corrected']
+    list_filter = ['kind', 'corrected', 'run']
+    search_fields = ['transaction_id']
+    raw_id_fields = ['payment', 'subscription']
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class PaymentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'payments'
\ No newline at end of file
+    name = 'payments'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,97 @@
+"""
+Payment gateways.
+
+The pipeline (payments.pipeline) talks to a gateway only through
+authorize() and capture(). Both take the payment and return a GatewayResult;
+they raise GatewayUnavailable for transient failures worth retrying. The
+payment id is passed as the gateway's idempotency key, so a retried call
+after a timeout cannot charge twice. PAYMENT_GATEWAY names the class to use.
+"""
+
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@dataclass
+class GatewayResult:
+    ok: bool
+    reference: str = ''
+    reason: str = ''
+
+
+class GatewayUnavailable(Exception):
+    """The gateway could not be reached; the step can be retried"""
+
+
+class PaymentGateway:
+    def authorize(self, payment):
+        raise NotImplementedError
+
+    def capture(self, payment):
+        raise NotImplementedError
+
+
+class SimulatedGateway(PaymentGateway):
+    """
+    Local stand-in for a real gateway: waits PAYMENT_GATEWAY_LATENCY seconds
+    per call and authorizes PAYMENT_GATEWAY_SUCCESS_RATE of payments.
+    Results are remembered per payment, like a gateway honouring idempotency keys.
+    """
+
+    # Results remembered for retried calls; the oldest are forgotten first
+    MAX_REMEMBERED = 10000
+
+    def __init__(self, latency=None, success_rate=None):
+        self._latency = latency
+        self._success_rate = success_rate
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def latency(self):
+        return settings.PAYMENT_GATEWAY_LATENCY if self._latency is None else self._latency
+
+    @property
+    def success_rate(self):
+        return settings.PAYMENT_GATEWAY_SUCCESS_RATE if self._success_rate is None else self._success_rate
+
+    def _call(self, operation, payment, decide):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            key = (operation, payment.pk)
+            if key not in self._results:
+                self._results[key] = decide()
+                if len(self._results) > self.MAX_REMEMBERED:
+                    self._results.popitem(last=False)
+            return self._results[key]
+
+    def authorize(self, payment):
+        def decide():
+            if random.random() < self.success_rate:
+                return GatewayResult(ok=True, reference=f'AUTH{uuid.uuid4().hex[:12].upper()}')
+            return GatewayResult(ok=False, reason='Declined by issuer')
+        return self._call('authorize', payment, decide)
+
+    def capture(self, payment):
+        return self._call('capture', payment, lambda: GatewayResult(ok=True, reference=payment.gateway_reference))
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = import_string(settings.PAYMENT_GATEWAY)()
+    return _gateway
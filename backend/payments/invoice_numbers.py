@@ -0,0 +1,116 @@
+"""
+Invoice number allocation.
+
+Numbers run per year as INV-<year>-<n>. InvoiceSequence keeps one counter row
+per year; allocating locks that row with select_for_update and advances it,
+so each number costs one indexed UPDATE whatever the number of invoices, and
+concurrent payments can never be given the same number.
+
+With INVOICE_NUMBER_BLOCK_SIZE = 1 (the default) the counter moves inside
+the transaction that saves the invoice (Invoice.save() opens one if the
+caller hasn't), so a rolled-back invoice returns its number and the
+sequence has no gaps. The row stays locked until that
+transaction ends, which serializes invoice creation within a year.
+
+A larger block size has each worker process reserve that many numbers at a
+time and hand them out from memory, so the counter row is only touched once
+per block. This trades away two guarantees:
+
+- Gaps: numbers still held when a process exits are never used, and an
+  invoice that is rolled back after taking a number from the block loses it.
+- Order: workers draw from different blocks, so numbers are unique but not
+  in creation order across workers.
+
+A block only becomes usable once the transaction reserving it commits; if
+that transaction rolls back, the counter and the block are discarded together.
+Invoices saved later in the same transaction therefore reserve blocks of their
+own, leaving the unused rest of each as a gap.
+"""
+
+import re
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Invoice, InvoiceSequence
+
+
+NUMBER_PATTERN = re.compile(r'^INV-(\d{4})-(\d+)$')
+
+
+def format_number(year, number):
+    return f'INV-{year}-{number:05d}'
+
+
+def _highest_existing(year):
+    """Highest number already issued for `year`; scanned once, when its counter row is created"""
+    numbers = Invoice.objects.filter(invoice_number__startswith=f'INV-{year}-').values_list('invoice_number', flat=True)
+    highest = 0
+    for invoice_number in numbers.iterator():
+        match = NUMBER_PATTERN.match(invoice_number)
+        if match:
+            highest = max(highest, int(match.group(2)))
+    return highest
+
+
+def allocate(year, count=1):
+    """Reserve `count` consecutive numbers for `year`; returns them as a range"""
+    with transaction.atomic():
+        sequence = InvoiceSequence.objects.select_for_update().filter(year=year).first()
+        if sequence is None:
+            InvoiceSequence.objects.bulk_create(
+                [InvoiceSequence(year=year, last_number=_highest_existing(year))], ignore_conflicts=True
+            )
+            sequence = InvoiceSequence.objects.select_for_update().get(year=year)
+        first = sequence.last_number + 1
+        sequence.last_number += count
+        sequence.save(update_fields=['last_number'])
+    return range(first, first + count)
+
+
+class BlockAllocator:
+    """Hands out numbers from blocks reserved for this process"""
+
+    def __init__(self, block_size):
+        self.block_size = block_size
+        self._blocks = {}
+        self._lock = threading.Lock()
+
+    def next_number(self, year):
+        with self._lock:
+            block = self._blocks.get(year)
+            if block:
+                return block.pop(0)
+
+        numbers = list(allocate(year, self.block_size))
+        number, rest = numbers[0], numbers[1:]
+
+        def keep():
+            with self._lock:
+                self._blocks.setdefault(year, []).extend(rest)
+
+        # Only keep the rest once the reservation is durable
+        transaction.on_commit(keep)
+        return number
+
+
+_allocator = None
+_allocator_lock = threading.Lock()
+
+
+def get_allocator():
+    global _allocator
+    if _allocator is None:
+        with _allocator_lock:
+            if _allocator is None:
+                _allocator = BlockAllocator(settings.INVOICE_NUMBER_BLOCK_SIZE)
+    return _allocator
+
+
+def next_invoice_number(year=None):
+    year = year or timezone.localdate().year
+    if settings.INVOICE_NUMBER_BLOCK_SIZE <= 1:
+        return format_number(year, allocate(year)[0])
+    return format_number(year, get_allocator().next_number(year))
@@ -0,0 +1,363 @@
+"""
+Invoice PDFs, rendered once and served from storage.
+
+The PDF is a pure function of a few invoice, customer and product fields.
+invoice_context() collects them, and their hash (with TEMPLATE_VERSION) is
+the key the rendered bytes are stored under. A download only needs that
+context to find the stored file. Changing any shown field, e.g. marking the
+invoice paid, changes the key, so a stale PDF is never served. Superseded
+files are left in place.
+
+A worker task renders each invoice when it is saved (payments.tasks), and
+downloads render synchronously only when the stored file is missing. The
+ReportLab styles are built once per process, and documents are written with
+`invariant=True` so the same context always produces the same bytes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.http import HttpResponse
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .models import Invoice
+
+
+# Bump when the layout changes, so every invoice is rendered again
+TEMPLATE_VERSION = 1
+
+
+# Relations invoice_context() reads
+PDF_RELATIONS = ('payment', 'subscription__product', 'subscription__customer__user')
+
+
+def invoice_queryset():
+    """Invoices with everything the PDF shows joined in"""
+    return Invoice.objects.select_related(*PDF_RELATIONS)
+
+
+def invoice_context(invoice):
+    """The values printed on the invoice, as plain strings"""
+    subscription = invoice.subscription
+    user = subscription.customer.user
+    return {
+        'invoice_number': invoice.invoice_number,
+        'invoice_date': invoice.invoice_date.strftime('%B %d, %Y'),
+        'is_paid': invoice.is_paid,
+        'transaction_id': invoice.payment.transaction_id if invoice.payment else 'N/A',
+        'customer_name': user.get_full_name() or user.email,
+        'customer_email': user.email,
+        'customer_phone': user.phone or 'N/A',
+        'product_name': subscription.product.name,
+        'duration_type': subscription.duration_type.capitalize(),
+        'start_date': subscription.start_date.strftime('%d/%m/%Y'),
+        'end_date': subscription.end_date.strftime('%d/%m/%Y'),
+        'rental_amount': f'₹{float(invoice.rental_amount):,.2f}',
+        'gst_amount': f'₹{float(invoice.gst_amount):,.2f}',
+        'security_deposit': f'₹{float(invoice.security_deposit):,.2f}',
+        'total_amount': f'₹{float(invoice.total_amount):,.2f}',
+    }
+
+
+def content_key(context):
+    payload = json.dumps({'version': TEMPLATE_VERSION, **context}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _styles():
+    styles = getSampleStyleSheet()
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=28,
+            textColor=colors.HexColor('#1E40AF'),
+            spaceAfter=20,
+            alignment=TA_CENTER,
+            fontName='Helvetica-Bold'
+        ),
+        'subtitle': ParagraphStyle(
+            'Subtitle',
+            parent=styles['Normal'],
+            fontSize=14,
+            textColor=colors.HexColor('#4B5563'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'header': ParagraphStyle(
+            'SectionHeader',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#1E40AF'),
+            spaceAfter=10,
+            fontName='Helvetica-Bold'
+        ),
+        'terms': ParagraphStyle(
+            'Terms',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.HexColor('#6B7280'),
+            spaceAfter=6
+        ),
+        'footer': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=9,
+            textColor=colors.HexColor('#4B5563'),
+            alignment=TA_CENTER
+        ),
+        'info_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#EFF6FF')),
+            ('BACKGROUND', (2, 0), (2, -1), colors.HexColor('#EFF6FF')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        'customer_table': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#F3F4F6')),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('TOPPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+        ]),
+        'rental_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E40AF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 10),
+            ('TOPPADDING', (0, 0), (-1, 0), 10),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#F9FAFB')),
+            ('FONTSIZE', (0, 1), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 1), (-1, -1), 8),
+            ('TOPPADDING', (0, 1), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ]),
+        'amount_table': TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E40AF')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 1), (-1, -2), colors.HexColor('#F9FAFB')),
+            ('LINEABOVE', (0, -1), (-1, -1), 2, colors.HexColor('#1E40AF')),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#DBEAFE')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ]),
+    }
+
+
+def render(context):
+    """The PDF bytes for an invoice_context()"""
+    styles = _styles()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch, invariant=True)
+    story = []
+
+    # Title
+    story.append(Paragraph('🏠 RENTKART', styles['title']))
+    story.append(Paragraph('TAX INVOICE', styles['subtitle']))
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Invoice Info Header
+    info_data = [
+        ['Invoice Number:', context['invoice_number'], 'Invoice Date:', context['invoice_date']],
+        ['Payment Status:', 'PAID' if context['is_paid'] else 'UNPAID', 'Transaction ID:', context['transaction_id']],
+    ]
+    info_table = Table(info_data, colWidths=[1.5*inch, 2*inch, 1.5*inch, 2*inch])
+    info_table.setStyle(styles['info_table'])
+    story.append(info_table)
+    story.append(Spacer(1, 0.4 * inch))
+
+    # Customer & Product Details
+    story.append(Paragraph('Customer Details', styles['header']))
+    customer_data = [
+        ['Customer Name:', context['customer_name']],
+        ['Email:', context['customer_email']],
+        ['Phone:', context['customer_phone']],
+    ]
+    customer_table = Table(customer_data, colWidths=[2*inch, 4.5*inch])
+    customer_table.setStyle(styles['customer_table'])
+    story.append(customer_table)
+    story.append(Spacer(1, 0.3 * inch))
+
+    # Rental Details
+    story.append(Paragraph('Rental Details', styles['header']))
+    rental_data = [
+        ['Product', 'Duration', 'Start Date', 'End Date', 'Amount'],
+        [
+            Paragraph(context['product_name'], styles['normal']),
+            context['duration_type'],
+            context['start_date'],
+            context['end_date'],
+            context['rental_amount'],
+        ]
+    ]
+    rental_table = Table(rental_data, colWidths=[2.5*inch, 1*inch, 1*inch, 1*inch, 1*inch])
+    rental_table.setStyle(styles['rental_table'])
+    story.append(rental_table)
+    story.append(Spacer(1, 0.4 * inch))
+
+    # Amount Breakdown
+    story.append(Paragraph('Payment Summary', styles['header']))
+    amount_data = [
+        ['Description', 'Amount'],
+        ['Rental Amount', context['rental_amount']],
+        ['GST (18%)', context['gst_amount']],
+        ['Security Deposit (Refundable)', context['security_deposit']],
+        ['Total Amount Paid', context['total_amount']]
+    ]
+    amount_table = Table(amount_data, colWidths=[5*inch, 1.5*inch])
+    amount_table.setStyle(styles['amount_table'])
+    story.append(amount_table)
+    story.append(Spacer(1, 0.4 * inch))
+
+    # Terms & Footer
+    terms_style = styles['terms']
+    story.append(Paragraph('<b>Terms & Conditions:</b>', terms_style))
+    story.append(Paragraph('1. Security deposit is fully refundable upon return of product in original condition.', terms_style))
+    story.append(Paragraph('2. Late returns may incur additional charges.', terms_style))
+    story.append(Paragraph('3. Customer is responsible for the product during rental period.', terms_style))
+    story.append(Spacer(1, 0.3 * inch))
+
+    story.append(Paragraph('Thank you for choosing Rentkart!', styles['footer']))
+    story.append(Paragraph('For support, contact: support@rentkart.com | +91 98765 43210', styles['footer']))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+class PDFStore:
+    """Rendered PDFs by content key, in any Django storage"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def _name(self, key):
+        return f'{key[:2]}/{key}.pdf'
+
+    def read(self, key):
+        try:
+            with self.storage.open(self._name(key), 'rb') as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, data):
+        name = self._name(key)
+        # The name is the content hash: an existing file already holds these bytes
+        if not self.storage.exists(name):
+            self.storage.save(name, ContentFile(data))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PDFStore(FileSystemStorage(location=settings.INVOICE_PDF_ROOT))
+    return _store
+
+
+def get_pdf(context, key=None):
+    """Stored PDF for `context`, rendered and stored first if missing"""
+    key = key or content_key(context)
+    store = get_store()
+    data = store.read(key)
+    if data is None:
+        data = render(context)
+        store.write(key, data)
+    return data
+
+
+def prerender(invoice_id):
+    """Render and store an invoice's PDF; returns its key, or None if the invoice is gone"""
+    invoice = invoice_queryset().filter(pk=invoice_id).first()
+    if invoice is None:
+        return None
+    context = invoice_context(invoice)
+    key = content_key(context)
+    get_pdf(context, key)
+    return key
+
+
+RANGE_PATTERN = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _byte_range(header, size):
+    """(start, end) for a single `bytes=` range, None to send everything, or False if unsatisfiable"""
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ('', ''):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        return False
+    return start, end
+
+
+def pdf_response(request, data, key, filename):
+    """Serve stored PDF bytes with an ETag, honouring If-None-Match and single Range requests"""
+    etag = f'"{key}"'
+    if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+        response = HttpResponse(status=304)
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    range_header = request.META.get('HTTP_RANGE')
+    if range_header and request.META.get('HTTP_IF_RANGE', etag) == etag:
+        byte_range = _byte_range(range_header, len(data))
+
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{len(data)}'
+    elif byte_range:
+        start, end = byte_range
+        response = HttpResponse(data[start:end + 1], content_type='application/pdf', status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{len(data)}'
+    else:
+        response = HttpResponse(data, content_type='application/pdf')
+
+    response['ETag'] = etag
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = 'private, max-age=0, must-revalidate'
+    response['Content-Disposition'] = f'attachment; filename="{os.path.basename(filename)}"'
+    return response
@@ -0,0 +1,118 @@
+"""
+Revenue ledger.
+
+Every successful payment appends a RevenueLedgerEntry and, in the same
+transaction, adds its amount to the hour and day RevenueBucket it falls in
+(local time). Entries are never edited: a refund or correction appends a
+reversal. Revenue over a window is then a sum of whole-day buckets plus the
+hour buckets at either edge, so a 30-day window reads about 80 rows at most.
+"""
+
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from rentkart_backend.counters import increment
+
+from .models import Payment, RevenueBucket, RevenueLedgerEntry
+
+
+def hour_start(value):
+    return timezone.localtime(value).replace(minute=0, second=0, microsecond=0)
+
+
+def day_start(value):
+    return timezone.localtime(value).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _add_to_buckets(occurred_at, amount, entries=1):
+    for granularity, start in (('hour', hour_start(occurred_at)), ('day', day_start(occurred_at))):
+        increment(RevenueBucket, {'granularity': granularity, 'start': start}, amount=amount, entries=entries)
+
+
+def _append(payment, kind, amount, occurred_at):
+    try:
+        with transaction.atomic():
+            entry = RevenueLedgerEntry.objects.create(
+                payment=payment, kind=kind, amount=amount, occurred_at=occurred_at
+            )
+            _add_to_buckets(occurred_at, amount)
+    except IntegrityError:
+        # Already recorded; the ledger is idempotent per payment and kind
+        return None
+    return entry
+
+
+def record_payment(payment):
+    """Recognise a successful payment's amount at its payment date"""
+    return _append(payment, 'payment', payment.amount, payment.payment_date or timezone.now())
+
+
+def record_reversal(payment, occurred_at=None):
+    """Take a previously recognised payment back out of revenue"""
+    return _append(payment, 'reversal', -payment.amount, occurred_at or timezone.now())
+
+
+def revenue(since, until=None):
+    """
+    Revenue recognised in [since, until), to the hour: `since` is rounded
+    down to its hour and the bucket holding `until` is included in full.
+    """
+    until = until or timezone.now()
+    since = hour_start(since)
+    end = hour_start(until) + timedelta(hours=1)
+
+    first_day = day_start(since)
+    if first_day < since:
+        first_day = day_start(since + timedelta(days=1))
+    last_day = day_start(end)
+
+    if first_day < last_day:
+        buckets = (
+            Q(granularity='day', start__gte=first_day, start__lt=last_day)
+            | Q(granularity='hour', start__gte=since, start__lt=first_day)
+            | Q(granularity='hour', start__gte=last_day, start__lt=end)
+        )
+    else:
+        buckets = Q(granularity='hour', start__gte=since, start__lt=end)
+
+    total = RevenueBucket.objects.filter(buckets).aggregate(total=Sum('amount'))['total']
+    return (total or Decimal('0')).quantize(Decimal('0.01'))
+
+
+def rebuild_ledger():
+    """Recreate the ledger and its buckets from successful payments"""
+    payments = Payment.objects.filter(status='success')
+    with transaction.atomic():
+        RevenueBucket.objects.all().delete()
+        RevenueLedgerEntry.objects.all().delete()
+
+        entries = [
+            RevenueLedgerEntry(
+                payment_id=payment_id, kind='payment', amount=amount,
+                occurred_at=payment_date or created_at,
+            )
+            for payment_id, amount, payment_date, created_at in payments.values_list(
+                'pk', 'amount', 'payment_date', 'created_at'
+            ).iterator()
+        ]
+        RevenueLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+
+        buckets = []
+        for granularity, trunc in (('hour', TruncHour), ('day', TruncDay)):
+            rows = (
+                RevenueLedgerEntry.objects.annotate(start=trunc('occurred_at'))
+                .values('start')
+                .annotate(total=Sum('amount'), count=Count('pk'))
+                .order_by()
+            )
+            buckets.extend(
+                RevenueBucket(granularity=granularity, start=row['start'], amount=row['total'], entries=row['count'])
+                for row in rows
+            )
+        RevenueBucket.objects.bulk_create(buckets, batch_size=1000)
+    return len(entries)
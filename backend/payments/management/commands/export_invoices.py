@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from payments.invoice_export import export_invoices
+from payments.models import Invoice
+from payments.serializers import InvoiceExportQuerySerializer
+
+
+class Command(BaseCommand):
+    help = 'Write the PDFs of a set of invoices into a ZIP archive, rendering them across a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('output', help='Path of the ZIP archive to write')
+        parser.add_argument('--month', help='YYYY-MM')
+        parser.add_argument('--start-date')
+        parser.add_argument('--end-date')
+        parser.add_argument('--paid', dest='is_paid', action='store_true', default=None)
+        parser.add_argument('--unpaid', dest='is_paid', action='store_false')
+        parser.add_argument('--workers', type=int, help='Defaults to INVOICE_EXPORT_WORKERS')
+
+    def handle(self, *args, **options):
+        filters = {
+            name: options[name] for name in ('month', 'start_date', 'end_date', 'is_paid')
+            if options[name] is not None
+        }
+        query = InvoiceExportQuerySerializer(data=filters)
+        if not query.is_valid():
+            raise CommandError(query.errors)
+
+        report = {}
+        with open(options['output'], 'wb') as archive:
+            for chunk in export_invoices(query.filter(Invoice.objects.all()), options['workers'], report):
+                archive.write(chunk)
+
+        self.stdout.write(
+            f"{report['invoices']} invoices ({report['rendered']} rendered, {report['stored']} already stored) "
+            f"with {report['workers']} workers in {report['seconds']}s"
+        )
+        self.stdout.write(self.style.SUCCESS(f"{report['invoices_per_second']} invoices/s -> {options['output']}"))
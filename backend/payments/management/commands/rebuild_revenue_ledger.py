@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payments.ledger import rebuild_ledger
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the revenue ledger and its hour/day buckets from successful payments'
+
+    def handle(self, *args, **options):
+        entries = rebuild_ledger()
+        self.stdout.write(self.style.SUCCESS(f'Revenue ledger rebuilt ({entries} payments)'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from payments.rollups import rebuild_vendor_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-vendor daily dashboard rollups from payments and subscriptions'
+
+    def handle(self, *args, **options):
+        rows = rebuild_vendor_stats()
+        self.stdout.write(self.style.SUCCESS(f'Vendor rollups rebuilt ({rows} vendor-days)'))
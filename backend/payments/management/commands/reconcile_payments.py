@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from django.db.models import Count
+
+from payments.models import ReconciliationIssue
+from payments.reconciliation import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Reconcile payments against a gateway settlement CSV, correcting what can be corrected'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Settlement CSV with transaction_id, amount, status[, settled_at]')
+        parser.add_argument('--dry-run', action='store_true', help='Report issues without correcting payments')
+        parser.add_argument('--grace-hours', type=int, help='Defaults to PAYMENT_RECONCILE_GRACE_HOURS')
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], 'rb') as file:
+                run = reconcile(file, options['file'], options['dry_run'], options['grace_hours'])
+        except (OSError, ValueError) as exc:
+            raise CommandError(exc)
+
+        self.stdout.write(f'{run.rows} rows, {run.matched} matched, {run.issues} issues')
+        labels = dict(ReconciliationIssue.KIND_CHOICES)
+        for row in run.issue_set.values('kind').annotate(count=Count('pk')).order_by('kind'):
+            self.stdout.write(f"  {labels[row['kind']]}: {row['count']}")
+        if run.dry_run:
+            self.stdout.write(self.style.SUCCESS(f'Run {run.pk}: dry run, nothing corrected'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Run {run.pk}: {run.corrected} corrected'))
@@ -0,0 +1,93 @@
+# Generated by Django 5.2.12 on 2026-10-18 12:53
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_vendor_stats(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    Subscription = apps.get_model("subscriptions", "Subscription")
+    VendorDailyStats = apps.get_model("payments", "VendorDailyStats")
+
+    rows = defaultdict(lambda: defaultdict(int))
+    payments = Payment.objects.filter(status="success").values_list(
+        "subscription__product__vendor_id", "payment_date", "created_at", "amount"
+    )
+    for vendor_id, payment_date, created_at, amount in payments:
+        stats = rows[vendor_id, timezone.localdate(payment_date or created_at)]
+        stats["earnings"] += amount or Decimal("0")
+        stats["payments_count"] += 1
+
+    subscriptions = Subscription.objects.values_list(
+        "product__vendor_id", "created_at", "status"
+    )
+    for vendor_id, created_at, status in subscriptions:
+        if status in ("pending", "active", "completed", "cancelled"):
+            rows[vendor_id, timezone.localdate(created_at)][f"{status}_rentals"] += 1
+
+    VendorDailyStats.objects.bulk_create(
+        [
+            VendorDailyStats(vendor_id=vendor_id, day=day, **stats)
+            for (vendor_id, day), stats in rows.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0002_initial"),
+        ("subscriptions", "0002_product_occupancy"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VendorDailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                (
+                    "earnings",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                ("payments_count", models.IntegerField(default=0)),
+                ("pending_rentals", models.IntegerField(default=0)),
+                ("active_rentals", models.IntegerField(default=0)),
+                ("completed_rentals", models.IntegerField(default=0)),
+                ("cancelled_rentals", models.IntegerField(default=0)),
+                (
+                    "vendor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Vendor daily stats",
+                "ordering": ["vendor", "day"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("vendor", "day"), name="unique_vendor_day_stats"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_vendor_stats, migrations.RunPython.noop),
+    ]
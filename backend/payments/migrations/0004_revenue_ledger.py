@@ -0,0 +1,129 @@
+# Generated by Django 5.2.12 on 2026-10-18 12:55
+
+import django.db.models.deletion
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_ledger(apps, schema_editor):
+    Payment = apps.get_model("payments", "Payment")
+    RevenueLedgerEntry = apps.get_model("payments", "RevenueLedgerEntry")
+    RevenueBucket = apps.get_model("payments", "RevenueBucket")
+
+    entries = []
+    buckets = defaultdict(lambda: [Decimal("0"), 0])
+    payments = Payment.objects.filter(status="success").values_list(
+        "pk", "amount", "payment_date", "created_at"
+    )
+    for payment_id, amount, payment_date, created_at in payments:
+        occurred_at = payment_date or created_at
+        entries.append(
+            RevenueLedgerEntry(
+                payment_id=payment_id, kind="payment", amount=amount, occurred_at=occurred_at
+            )
+        )
+        local = timezone.localtime(occurred_at)
+        hour = local.replace(minute=0, second=0, microsecond=0)
+        for key in (("hour", hour), ("day", hour.replace(hour=0))):
+            buckets[key][0] += amount
+            buckets[key][1] += 1
+
+    RevenueLedgerEntry.objects.bulk_create(entries, batch_size=1000)
+    RevenueBucket.objects.bulk_create(
+        [
+            RevenueBucket(granularity=granularity, start=start, amount=amount, entries=count)
+            for (granularity, start), (amount, count) in buckets.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0003_vendor_daily_stats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevenueBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "granularity",
+                    models.CharField(
+                        choices=[("hour", "Hour"), ("day", "Day")], max_length=10
+                    ),
+                ),
+                ("start", models.DateTimeField()),
+                (
+                    "amount",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("entries", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["granularity", "start"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("granularity", "start"), name="unique_revenue_bucket"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="RevenueLedgerEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[("payment", "Payment"), ("reversal", "Reversal")],
+                        default="payment",
+                        max_length=20,
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("occurred_at", models.DateTimeField()),
+                ("recorded_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "payment",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="ledger_entries",
+                        to="payments.payment",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Revenue ledger entries",
+                "ordering": ["occurred_at"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("payment", "kind"), name="unique_payment_ledger_kind"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.12 on 2026-10-18 13:12
+
+import re
+
+from django.db import migrations, models
+
+
+def backfill_sequences(apps, schema_editor):
+    Invoice = apps.get_model("payments", "Invoice")
+    InvoiceSequence = apps.get_model("payments", "InvoiceSequence")
+
+    pattern = re.compile(r"^INV-(\d{4})-(\d+)$")
+    highest = {}
+    for invoice_number in Invoice.objects.values_list("invoice_number", flat=True).iterator():
+        match = pattern.match(invoice_number or "")
+        if match:
+            year, number = int(match.group(1)), int(match.group(2))
+            highest[year] = max(highest.get(year, 0), number)
+
+    InvoiceSequence.objects.bulk_create(
+        [InvoiceSequence(year=year, last_number=number) for year, number in highest.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0004_revenue_ledger"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InvoiceSequence",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField(unique=True)),
+                ("last_number", models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["year"],
+            },
+        ),
+        migrations.RunPython(backfill_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.12 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0005_invoice_sequence"),
+        ("subscriptions", "0002_product_occupancy"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="authorized_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="failure_reason",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="gateway_reference",
+            field=models.CharField(blank=True, max_length=100),
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="idempotency_key",
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AlterField(
+            model_name="payment",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("authorized", "Authorized"),
+                    ("success", "Success"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="payment",
+            constraint=models.UniqueConstraint(
+                fields=("subscription", "idempotency_key"),
+                name="unique_payment_idempotency_key",
+            ),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.2.12 on 2026-10-18 13:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0006_payment_pipeline"),
+        ("subscriptions", "0002_product_occupancy"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReconciliationRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("source", models.CharField(max_length=255)),
+                ("dry_run", models.BooleanField(default=False)),
+                ("started_at", models.DateTimeField(default=django.utils.timezone.now)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                ("rows", models.IntegerField(default=0)),
+                ("matched", models.IntegerField(default=0)),
+                ("issues", models.IntegerField(default=0)),
+                ("corrected", models.IntegerField(default=0)),
+            ],
+            options={
+                "ordering": ["-started_at"],
+            },
+        ),
+        migrations.AddField(
+            model_name="payment",
+            name="reconciled_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name="ReconciliationIssue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("invalid_row", "Invalid row"),
+                            ("duplicate_row", "Duplicate row"),
+                            ("unknown_transaction", "Unknown transaction"),
+                            ("amount_mismatch", "Amount mismatch"),
+                            ("status_mismatch", "Status mismatch"),
+                            ("orphaned_pending", "Orphaned pending payment"),
+                            (
+                                "unpaid_subscription",
+                                "Active subscription without a successful payment",
+                            ),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("row", models.IntegerField(blank=True, null=True)),
+                ("transaction_id", models.CharField(blank=True, max_length=100)),
+                ("detail", models.CharField(blank=True, max_length=255)),
+                ("corrected", models.BooleanField(default=False)),
+                (
+                    "payment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="reconciliation_issues",
+                        to="payments.payment",
+                    ),
+                ),
+                (
+                    "subscription",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="reconciliation_issues",
+                        to="subscriptions.subscription",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="issue_set",
+                        to="payments.reconciliationrun",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["run", "id"],
+            },
+        ),
+    ]
@@ -1,5 +1,5 @@
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from users.models import User
 from products.models import Product
@@ -19,14 +19,18 @@ class Payment(models.Model):
         ('wallet', 'Digital Wallet'),
     ]
     
+    # pending -> authorized -> success (captured) / failed, see payments.pipeline
     STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('authorized', 'Authorized'),
         ('success', 'Success'),
         ('failed', 'Failed'),
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     subscription = models.ForeignKey(Subscription, on_delete=models.CASCADE, related_name='payments')
+    # Client-supplied key; a retried request with the same key reuses this payment
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
     
     payment_method = models.CharField(max_length=20, choices=PAYMENT_METHOD_CHOICES)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -34,12 +38,24 @@ class Payment(models.Model):
     transaction_id = models.CharField(max_length=100, unique=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     
+    # Gateway side of the payment
+    gateway_reference = models.CharField(max_length=100, blank=True)
+    failure_reason = models.CharField(max_length=255, blank=True)
+    authorized_at = models.DateTimeField(null=True, blank=True)
+    # Start of the last (non dry) reconciliation run whose settlement file listed this payment
+    reconciled_at = models.DateTimeField(null=True, blank=True)
+    
     payment_date = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['subscription', 'idempotency_key'], name='unique_payment_idempotency_key'
+            ),
+        ]
     
     def __str__(self):
         return f"{self.transaction_id} - {self.status}"
@@ -47,7 +63,9 @@ class Payment(models.Model):
     def save(self, *args, **kwargs):
         if not self.transaction_id:
             self.transaction_id = f"TXN{datetime.now().strftime('%Y%m%d')}{str(uuid.uuid4())[:8].upper()}"
-        super().save(*args, **kwargs)
+        # The signal receivers' rollup deltas commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
 
 class Invoice(models.Model):
@@ -82,13 +100,6 @@ class Invoice(models.Model):
         return self.invoice_number
     
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            year = datetime.now().year
-            count = Invoice.objects.filter(
-                invoice_number__startswith=f'INV-{year}'
-            ).count() + 1
-            self.invoice_number = f'INV-{year}-{count:05d}'
-        
         # Calculate GST (18%) - Use Decimal for calculation
         if not self.gst_amount or self.gst_amount == 0:
             gst_rate = Decimal('0.18')
@@ -97,4 +108,167 @@ class Invoice(models.Model):
         # Calculate total
         self.total_amount = self.rental_amount + self.security_deposit + self.gst_amount
         
-        super().save(*args, **kwargs)
+        numbered = not self.invoice_number
+        try:
+            # A failed insert hands its number back to the sequence
+            with transaction.atomic():
+                if numbered:
+                    from .invoice_numbers import next_invoice_number
+                    self.invoice_number = next_invoice_number()
+                super().save(*args, **kwargs)
+        except Exception:
+            if numbered:
+                # The number was rolled back and will be given out again
+                self.invoice_number = ''
+            raise
+
+
+class InvoiceSequence(models.Model):
+    """Last invoice number handed out for a year (see payments.invoice_numbers)"""
+    
+    year = models.PositiveIntegerField(unique=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['year']
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+
+
+class ReconciliationRun(models.Model):
+    """One pass of a settlement file over the payments (see payments.reconciliation)"""
+    
+    source = models.CharField(max_length=255)
+    dry_run = models.BooleanField(default=False)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    rows = models.IntegerField(default=0)
+    matched = models.IntegerField(default=0)
+    issues = models.IntegerField(default=0)
+    corrected = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-started_at']
+    
+    def __str__(self):
+        return f"{self.source} @ {self.started_at}"
+
+
+class ReconciliationListing(models.Model):
+    """A payment the run's settlement file has listed so far; cleared when the run finishes"""
+    
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='listings')
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='+')
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['run', 'payment'], name='unique_reconciliation_listing'),
+        ]
+
+
+class ReconciliationIssue(models.Model):
+    """A disagreement between a settlement file and the payments, and whether it was corrected"""
+    
+    KIND_CHOICES = [
+        ('invalid_row', 'Invalid row'),
+        ('duplicate_row', 'Duplicate row'),
+        ('unknown_transaction', 'Unknown transaction'),
+        ('amount_mismatch', 'Amount mismatch'),
+        ('status_mismatch', 'Status mismatch'),
+        ('orphaned_pending', 'Orphaned pending payment'),
+        ('unpaid_subscription', 'Active subscription without a successful payment'),
+    ]
+    
+    run = models.ForeignKey(ReconciliationRun, on_delete=models.CASCADE, related_name='issue_set')
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    # Settlement file line, for issues raised by a row
+    row = models.IntegerField(null=True, blank=True)
+    transaction_id = models.CharField(max_length=100, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, blank=True, related_name='reconciliation_issues')
+    subscription = models.ForeignKey(Subscription, on_delete=models.SET_NULL, null=True, blank=True, related_name='reconciliation_issues')
+    detail = models.CharField(max_length=255, blank=True)
+    corrected = models.BooleanField(default=False)
+    
+    class Meta:
+        ordering = ['run', 'id']
+    
+    def __str__(self):
+        return f"{self.kind} {self.transaction_id or self.subscription_id}"
+
+
+class VendorDailyStats(models.Model):
+    """Per-vendor, per-day rollup behind the vendor dashboard (see payments.rollups)"""
+    
+    vendor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField()
+    
+    # Successful payments for the vendor's products, by payment date
+    earnings = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments_count = models.IntegerField(default=0)
+    
+    # Subscriptions created on this day, by their current status
+    pending_rentals = models.IntegerField(default=0)
+    active_rentals = models.IntegerField(default=0)
+    completed_rentals = models.IntegerField(default=0)
+    cancelled_rentals = models.IntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'Vendor daily stats'
+        ordering = ['vendor', 'day']
+        constraints = [
+            models.UniqueConstraint(fields=['vendor', 'day'], name='unique_vendor_day_stats'),
+        ]
+    
+    def __str__(self):
+        return f"{self.vendor_id} @ {self.day}"
+
+
+class RevenueLedgerEntry(models.Model):
+    """Append-only record of revenue recognised from a payment (see payments.ledger)"""
+    
+    KIND_CHOICES = [
+        ('payment', 'Payment'),
+        ('reversal', 'Reversal'),
+    ]
+    
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, null=True, related_name='ledger_entries')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default='payment')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    occurred_at = models.DateTimeField()
+    recorded_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        verbose_name_plural = 'Revenue ledger entries'
+        ordering = ['occurred_at']
+        constraints = [
+            # A payment is recognised (and reversed) at most once
+            models.UniqueConstraint(fields=['payment', 'kind'], name='unique_payment_ledger_kind'),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind} {self.amount} @ {self.occurred_at}"
+
+
+class RevenueBucket(models.Model):
+    """Ledger totals per local hour and per local day"""
+    
+    GRANULARITY_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+    
+    granularity = models.CharField(max_length=10, choices=GRANULARITY_CHOICES)
+    start = models.DateTimeField()
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    entries = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['granularity', 'start']
+        constraints = [
+            models.UniqueConstraint(fields=['granularity', 'start'], name='unique_revenue_bucket'),
+        ]
+    
+    def __str__(self):
+        return f"{self.granularity} {self.start}: {self.amount}"
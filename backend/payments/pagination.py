@@ -0,0 +1,7 @@
+from products.pagination import ProductCursorPagination
+
+
+class BillingCursorPagination(ProductCursorPagination):
+    """Keyset pagination for a customer's payments and invoices, newest first"""
+    page_size = 20
+    ordering = '-created_at'
@@ -0,0 +1,19 @@
+"""
+Process pool entry points for rendering invoice PDFs (see payments.invoice_export).
+
+Kept free of Django imports at module level so a worker started with `spawn`
+can unpickle them before Django is set up.
+"""
+
+import os
+
+
+def init():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rentkart_backend.settings')
+    import django
+    django.setup()
+
+
+def render(context):
+    from .invoice_pdf import render as render_pdf
+    return render_pdf(context)
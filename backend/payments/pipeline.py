@@ -0,0 +1,142 @@
+"""
+Payment processing pipeline.
+
+A payment moves pending -> authorized -> success (captured) or failed.
+'success' is the captured state: it is the status the vendor rollups, the
+revenue ledger and the reports already count. start_payment() only records
+the pending payment. The worker task (payments.tasks.process_payment) then
+calls advance(), which runs each gateway step outside any transaction and
+records its outcome under a row lock. A step whose payment has already moved
+on is skipped, so a task delivered twice does no harm.
+
+Capturing also activates the subscription, creates its invoice and records
+the revenue, all in the transaction that marks the payment successful.
+`payment_finished` is sent once a payment reaches success or failed.
+
+Clients send an Idempotency-Key with each payment request. A retry with the
+same key for the same subscription gets the original payment back instead of
+a new one.
+"""
+
+from django.db import IntegrityError, transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .gateways import get_gateway
+from .ledger import record_payment as record_revenue
+from .models import Invoice, Payment
+
+
+FINAL_STATUSES = ('success', 'failed')
+
+# Sent with `payment` once it reaches success or failed
+payment_finished = Signal()
+
+
+def start_payment(subscription, payment_method, idempotency_key=None):
+    """
+    The pending payment for this request and whether it was created now; a
+    repeated idempotency key returns the payment the first request created
+    """
+    if idempotency_key:
+        existing = Payment.objects.filter(subscription=subscription, idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return existing, False
+
+    from .tasks import process_payment
+    try:
+        with transaction.atomic():
+            payment = Payment.objects.create(
+                subscription=subscription,
+                payment_method=payment_method,
+                amount=subscription.total_amount,
+                status='pending',
+                idempotency_key=idempotency_key or None,
+            )
+            payment_id = str(payment.pk)
+            transaction.on_commit(lambda: process_payment.delay(payment_id))
+    except IntegrityError:
+        # A concurrent retry with the same key got there first
+        return Payment.objects.get(subscription=subscription, idempotency_key=idempotency_key), False
+    return payment, True
+
+
+def _transition(payment_id, expected, **changes):
+    """Apply `changes` if the payment is still in an `expected` status; returns the payment or None"""
+    if isinstance(expected, str):
+        expected = (expected,)
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().filter(pk=payment_id, status__in=expected).first()
+        if payment is None:
+            return None
+        for field, value in changes.items():
+            setattr(payment, field, value)
+        payment.save()
+        if changes.get('status') == 'success':
+            _fulfil(payment)
+    if payment.status in FINAL_STATUSES:
+        payment_finished.send(sender=Payment, payment=payment)
+    return payment
+
+
+def _fulfil(payment):
+    """Activate the subscription, invoice it and recognise the revenue"""
+    subscription = payment.subscription
+    if subscription.status == 'pending':
+        subscription.status = 'active'
+        subscription.save()
+
+    now = timezone.now()
+    invoice, created = Invoice.objects.get_or_create(
+        subscription=subscription,
+        defaults={
+            'payment': payment,
+            'rental_amount': subscription.total_amount - (subscription.security_deposit or 0),
+            'security_deposit': subscription.security_deposit or 0,
+            'is_paid': True,
+            'paid_date': now,
+        },
+    )
+    if not created and not invoice.is_paid:
+        invoice.payment = payment
+        invoice.is_paid = True
+        invoice.paid_date = now
+        invoice.save()
+    record_revenue(payment)
+
+
+def advance(payment_id, gateway=None):
+    """Run the payment's remaining steps; returns it in its final status"""
+    gateway = gateway or get_gateway()
+    payment = Payment.objects.get(pk=payment_id)
+
+    if payment.status == 'pending':
+        result = gateway.authorize(payment)
+        if result.ok:
+            moved = _transition(
+                payment_id, 'pending',
+                status='authorized', gateway_reference=result.reference, authorized_at=timezone.now(),
+            )
+        else:
+            moved = _transition(payment_id, 'pending', status='failed', failure_reason=result.reason)
+        payment = moved or Payment.objects.get(pk=payment_id)
+
+    if payment.status == 'authorized':
+        result = gateway.capture(payment)
+        if result.ok:
+            moved = _transition(payment_id, 'authorized', status='success', payment_date=timezone.now())
+        else:
+            moved = _transition(payment_id, 'authorized', status='failed', failure_reason=result.reason)
+        payment = moved or Payment.objects.get(pk=payment_id)
+
+    return payment
+
+
+def settle(payment_id, captured_at):
+    """
+    Capture a payment the gateway reports as settled, whatever step it is at;
+    returns the payment, or None if it was already captured
+    """
+    return _transition(
+        payment_id, ('pending', 'authorized', 'failed'), status='success', payment_date=captured_at, failure_reason='',
+    )
@@ -0,0 +1,251 @@
+"""
+Payment reconciliation against a gateway settlement file.
+
+The settlement CSV has a row per transaction with `transaction_id`, `amount`,
+`status` (settled/success/captured or failed/declined) and optionally
+`settled_at`. It is read a line at a time and handled CHUNK_SIZE rows at a
+time: the chunk is indexed by transaction id in a dict, the matching payments
+are fetched with one query on the unique transaction_id index, and the issues
+found are written with one bulk insert. Nothing outlives its chunk except the
+run's counters, so memory stays flat however long the file is.
+
+Each payment the file lists is recorded as a ReconciliationListing of the
+run, a bulk insert per chunk. That is how a later chunk spots a repeated row,
+and how the run finds, after the file, the orphaned payments: pending or
+authorized for longer than PAYMENT_RECONCILE_GRACE_HOURS without being
+listed. The listings are deleted when the run finishes. Active subscriptions
+without a successful payment are reported too.
+
+Corrections, which a dry run skips along with every other change to payments:
+- listed payments get `reconciled_at` set to the run's start
+- failed in the file, or orphaned, while pending or authorized here: failed
+  with one UPDATE per chunk
+- settled in the file but not captured here: captured one at a time through
+  pipeline.settle(), the same capture the payment worker makes. Each one
+  takes an invoice number from the locked sequence, creates the invoice and
+  moves the rollups through the save signals, which have no bulk form. A
+  settled payment that was never captured is the exception in a settlement
+  file, so these stay few.
+
+Amount mismatches, and payments captured here that the file says failed, are
+only reported; they need someone to look at them.
+"""
+
+import csv
+import io
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Payment, ReconciliationIssue, ReconciliationListing, ReconciliationRun
+from .pipeline import settle
+
+
+CHUNK_SIZE = 2000
+SETTLEMENT_STATUSES = {
+    'settled': 'success',
+    'success': 'success',
+    'captured': 'success',
+    'failed': 'failed',
+    'declined': 'failed',
+}
+OPEN_STATUSES = ('pending', 'authorized')
+
+
+def read_settlement(file):
+    """(line number, row) pairs of a binary settlement CSV; raises ValueError if it can't be read"""
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    try:
+        columns = {name.strip() for name in reader.fieldnames or ()}
+    except UnicodeDecodeError:
+        raise ValueError('The file is not UTF-8 encoded')
+    missing = {'transaction_id', 'amount', 'status'} - columns
+    if missing:
+        raise ValueError(f"Settlement file is missing columns: {', '.join(sorted(missing))}")
+    return _settlement_rows(reader)
+
+
+def _settlement_rows(reader):
+    try:
+        for row in reader:
+            yield reader.line_num, {key.strip(): (value or '').strip() for key, value in row.items() if key}
+    except UnicodeDecodeError:
+        raise ValueError(f'The file is not UTF-8 encoded (after line {reader.line_num})')
+    except csv.Error as exc:
+        raise ValueError(f'Invalid CSV on line {reader.line_num}: {exc}')
+
+
+def _parse(row):
+    """(transaction_id, amount, status, settled_at) of a row, or raise ValueError"""
+    transaction_id = row.get('transaction_id')
+    if not transaction_id:
+        raise ValueError('Missing transaction_id')
+    try:
+        amount = Decimal(row.get('amount'))
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid amount {row.get('amount')!r}")
+    status = SETTLEMENT_STATUSES.get(row.get('status', '').lower())
+    if status is None:
+        raise ValueError(f"Unknown status {row.get('status')!r}")
+    settled_at = None
+    if row.get('settled_at'):
+        settled_at = parse_datetime(row['settled_at'])
+        if settled_at is None:
+            raise ValueError(f"Invalid settled_at {row['settled_at']!r}")
+        if timezone.is_naive(settled_at):
+            settled_at = timezone.make_aware(settled_at)
+    return transaction_id, amount, status, settled_at
+
+
+class Reconciler:
+    def __init__(self, run, chunk_size=CHUNK_SIZE):
+        self.run = run
+        self.chunk_size = chunk_size
+        self.correct = not run.dry_run
+
+    def issue(self, kind, **fields):
+        self.run.issues += 1
+        if fields.get('corrected'):
+            self.run.corrected += 1
+        return ReconciliationIssue(run=self.run, kind=kind, **fields)
+
+    def reconcile_chunk(self, rows):
+        issues = []
+        index = {}
+        for line, row in rows:
+            self.run.rows += 1
+            try:
+                transaction_id, amount, status, settled_at = _parse(row)
+            except ValueError as exc:
+                issues.append(self.issue('invalid_row', row=line, transaction_id=row.get('transaction_id', '')[:100], detail=str(exc)))
+                continue
+            if transaction_id in index:
+                issues.append(self.issue('duplicate_row', row=line, transaction_id=transaction_id, detail=f'Also on line {index[transaction_id][0]}'))
+                continue
+            index[transaction_id] = (line, amount, status, settled_at)
+
+        payments = list(Payment.objects.filter(transaction_id__in=index).only(
+            'id', 'transaction_id', 'amount', 'status'
+        ))
+        listed = set(
+            self.run.listings.filter(payment__in=payments).values_list('payment_id', flat=True)
+        )
+        capture = []
+        fail = []
+        for payment in payments:
+            line, amount, status, settled_at = index.pop(payment.transaction_id)
+            issue = {'row': line, 'transaction_id': payment.transaction_id, 'payment': payment}
+            if payment.pk in listed:
+                issues.append(self.issue('duplicate_row', detail='Listed earlier in the file', **issue))
+                continue
+            if payment.amount != amount:
+                issues.append(self.issue('amount_mismatch', detail=f'Settled {amount}, recorded {payment.amount}', **issue))
+                continue
+            if payment.status == status:
+                self.run.matched += 1
+                continue
+            detail = f'Settlement says {status}, recorded {payment.status}'
+            if status == 'success':
+                capture.append((payment.pk, settled_at or self.run.started_at))
+            elif payment.status in OPEN_STATUSES:
+                fail.append(payment.pk)
+            else:
+                # Captured here but failed at the gateway: a refund question, not ours to settle
+                issues.append(self.issue('status_mismatch', detail=detail, **issue))
+                continue
+            issues.append(self.issue('status_mismatch', detail=detail, corrected=self.correct, **issue))
+
+        for transaction_id, (line, *_) in index.items():
+            issues.append(self.issue('unknown_transaction', row=line, transaction_id=transaction_id, detail='No such payment'))
+
+        new = [payment.pk for payment in payments if payment.pk not in listed]
+        with transaction.atomic():
+            ReconciliationListing.objects.bulk_create(
+                [ReconciliationListing(run=self.run, payment_id=pk) for pk in new]
+            )
+            if self.correct:
+                Payment.objects.filter(pk__in=new).update(reconciled_at=self.run.started_at)
+                self.fail(fail, 'Failed at the gateway (reconciliation)')
+            ReconciliationIssue.objects.bulk_create(issues)
+        if self.correct:
+            # Each capture commits on its own, so payment_finished goes out once it has
+            for payment_id, captured_at in capture:
+                settle(payment_id, captured_at)
+
+    def fail(self, payment_ids, reason):
+        Payment.objects.filter(pk__in=payment_ids, status__in=OPEN_STATUSES).update(
+            status='failed', failure_reason=reason, updated_at=timezone.now()
+        )
+
+    def keyset(self, queryset, fields):
+        """Rows of `queryset` in pk order, a chunk at a time, unaffected by updates made in between"""
+        last = None
+        while True:
+            page = queryset.order_by('pk')
+            if last is not None:
+                page = page.filter(pk__gt=last)
+            chunk = list(page.values_list('pk', *fields)[:self.chunk_size])
+            if not chunk:
+                return
+            yield chunk
+            last = chunk[-1][0]
+
+    def reconcile_orphans(self, grace_hours):
+        cutoff = self.run.started_at - timedelta(hours=grace_hours)
+        orphans = Payment.objects.filter(status__in=OPEN_STATUSES, created_at__lt=cutoff).exclude(
+            Exists(self.run.listings.filter(payment=OuterRef('pk')))
+        )
+        for chunk in self.keyset(orphans, ['transaction_id', 'status']):
+            issues = [
+                self.issue(
+                    'orphaned_pending', transaction_id=transaction_id, payment_id=pk, corrected=self.correct,
+                    detail=f'{status.capitalize()} for over {grace_hours}h and not in the settlement file',
+                )
+                for pk, transaction_id, status in chunk
+            ]
+            with transaction.atomic():
+                if self.correct:
+                    self.fail([pk for pk, *_ in chunk], 'Not settled by the gateway (reconciliation)')
+                ReconciliationIssue.objects.bulk_create(issues)
+
+    def reconcile_unpaid_subscriptions(self):
+        from subscriptions.models import Subscription
+
+        unpaid = Subscription.objects.filter(status='active').exclude(payments__status='success')
+        for chunk in self.keyset(unpaid, []):
+            ReconciliationIssue.objects.bulk_create([
+                self.issue('unpaid_subscription', subscription_id=pk, detail='Active without a successful payment')
+                for pk, in chunk
+            ])
+
+
+def reconcile(file, source='', dry_run=False, grace_hours=None, chunk_size=CHUNK_SIZE):
+    """
+    Reconcile the payments against the settlement CSV in binary `file`.
+    Returns the finished ReconciliationRun; its issues are in `run.issue_set`.
+    """
+    if grace_hours is None:
+        grace_hours = settings.PAYMENT_RECONCILE_GRACE_HOURS
+    rows = read_settlement(file)
+
+    run = ReconciliationRun.objects.create(source=source[:255], dry_run=dry_run)
+    reconciler = Reconciler(run, chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        reconciler.reconcile_chunk(chunk)
+
+    reconciler.reconcile_orphans(grace_hours)
+    reconciler.reconcile_unpaid_subscriptions()
+    run.listings.all().delete()
+
+    run.finished_at = timezone.now()
+    run.save()
+    return run
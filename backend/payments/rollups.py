@@ -0,0 +1,163 @@
+"""
+Per-vendor daily rollups for the vendor dashboard.
+
+VendorDailyStats keeps one row per vendor and day: the successful payments
+received that day, and the subscriptions created that day counted by their
+current status. Signals (payments.signals) apply each change as a delta, so
+summing a vendor's rows gives the dashboard totals and the rows themselves
+are the earnings series.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from rentkart_backend.counters import increment
+
+from .models import Payment, VendorDailyStats
+
+
+RENTAL_STATUSES = ('pending', 'active', 'completed', 'cancelled')
+STAT_FIELDS = ('earnings', 'payments_count') + tuple(f'{status}_rentals' for status in RENTAL_STATUSES)
+
+
+def local_day(value):
+    return timezone.localdate(value or timezone.now())
+
+
+def rental_field(status):
+    if status in RENTAL_STATUSES:
+        return f'{status}_rentals'
+    return None
+
+
+def bump(vendor_id, day, **deltas):
+    """Add `deltas` to the vendor's row for `day`, creating it if needed"""
+    increment(VendorDailyStats, {'vendor_id': vendor_id, 'day': day}, **deltas)
+
+
+def record_payment(vendor_id, day, amount, sign=1):
+    bump(vendor_id, day, earnings=sign * amount, payments_count=sign)
+
+
+def record_rental(vendor_id, day, status, sign=1):
+    field = rental_field(status)
+    if field and vendor_id is not None:
+        bump(vendor_id, day, **{field: sign})
+
+
+def move_rentals(vendor_id, day, previous, status, count=1):
+    """Move `count` of the vendor's rentals for `day` from one status to another"""
+    deltas = {}
+    for field, delta in ((rental_field(previous), -count), (rental_field(status), count)):
+        if field:
+            deltas[field] = deltas.get(field, 0) + delta
+    if vendor_id is not None:
+        bump(vendor_id, day, **deltas)
+
+
+def totals(vendor):
+    """Dashboard totals from the vendor's rollup rows, in one query"""
+    result = VendorDailyStats.objects.filter(vendor=vendor).aggregate(
+        **{field: Sum(field) for field in STAT_FIELDS}
+    )
+    return {field: value or 0 for field, value in result.items()}
+
+
+def _period_start(day, interval):
+    if interval == 'week':
+        return day - timedelta(days=day.weekday())
+    if interval == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def earnings_series(vendor, days, interval='day'):
+    """
+    Earnings, payments and new rentals per period over the last `days` days,
+    oldest first, with empty periods filled in
+    """
+    today = timezone.localdate()
+    since = today - timedelta(days=days - 1)
+    rows = VendorDailyStats.objects.filter(vendor=vendor, day__gte=since)
+    if interval != 'day':
+        trunc = TruncWeek if interval == 'week' else TruncMonth
+        rows = rows.annotate(period=trunc('day')).values('period')
+    else:
+        rows = rows.annotate(period=F('day')).values('period')
+    rows = rows.annotate(
+        earnings=Sum('earnings'),
+        payments=Sum('payments_count'),
+        rentals=Sum(sum((F(f'{status}_rentals') for status in RENTAL_STATUSES[1:]), F('pending_rentals'))),
+    ).order_by()
+    by_period = {row['period']: row for row in rows}
+
+    series = []
+    period = _period_start(since, interval)
+    while period <= today:
+        row = by_period.get(period, {})
+        series.append({
+            'period': period.isoformat(),
+            'earnings': float(row.get('earnings') or 0),
+            'payments': row.get('payments') or 0,
+            'rentals': row.get('rentals') or 0,
+        })
+        if interval == 'month':
+            period = (period + timedelta(days=32)).replace(day=1)
+        else:
+            period += timedelta(days=7 if interval == 'week' else 1)
+    return series
+
+
+def rebuild_vendor_stats(vendor_ids=None):
+    """Recompute the rollup from payments and subscriptions"""
+    from subscriptions.models import Subscription
+
+    payments = Payment.objects.filter(status='success')
+    subscriptions = Subscription.objects.all()
+    rollup = VendorDailyStats.objects.all()
+    if vendor_ids is not None:
+        payments = payments.filter(subscription__product__vendor_id__in=vendor_ids)
+        subscriptions = subscriptions.filter(product__vendor_id__in=vendor_ids)
+        rollup = rollup.filter(vendor_id__in=vendor_ids)
+
+    rows = defaultdict(dict)
+    # payment_date is only missing on rows written outside process_payment
+    earnings = (
+        payments.annotate(day=TruncDate(Coalesce('payment_date', 'created_at')))
+        .values('subscription__product__vendor_id', 'day')
+        .annotate(earnings=Sum('amount'), payments_count=Count('pk'))
+        .order_by()
+    )
+    for row in earnings:
+        stats = rows[row['subscription__product__vendor_id'], row['day']]
+        stats['earnings'] = stats.get('earnings', Decimal('0')) + row['earnings']
+        stats['payments_count'] = stats.get('payments_count', 0) + row['payments_count']
+
+    rentals = (
+        subscriptions.annotate(day=TruncDate('created_at'))
+        .values('product__vendor_id', 'day')
+        .annotate(**{
+            rental_field(status): Count('pk', filter=Q(status=status))
+            for status in RENTAL_STATUSES
+        })
+        .order_by()
+    )
+    for row in rentals:
+        stats = rows[row['product__vendor_id'], row['day']]
+        for status in RENTAL_STATUSES:
+            stats[rental_field(status)] = row[rental_field(status)]
+
+    with transaction.atomic():
+        rollup.delete()
+        VendorDailyStats.objects.bulk_create(
+            [VendorDailyStats(vendor_id=vendor_id, day=day, **stats)
+             for (vendor_id, day), stats in rows.items()],
+            batch_size=1000,
+        )
+    return len(rows)
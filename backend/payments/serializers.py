@@ -1,20 +1,26 @@
 from rest_framework import serializers
 from .models import Payment, Invoice
+from subscriptions.serializers import SubscriptionSerializer
+from rentkart_backend.sparse_fields import SparseFieldsMixin
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    sparse_params = True
+    
     class Meta:
         model = Payment
         fields = [
             'id', 'subscription', 'payment_method', 'amount',
-            'transaction_id', 'status', 'payment_date',
+            'transaction_id', 'status', 'failure_reason', 'payment_date',
             'created_at', 'updated_at'
         ]
-        read_only_fields = ['transaction_id', 'payment_date', 'created_at', 'updated_at']
+        read_only_fields = ['transaction_id', 'failure_reason', 'payment_date', 'created_at', 'updated_at']
+
 
+class InvoiceSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    sparse_params = True
 
-class InvoiceSerializer(serializers.ModelSerializer):
-    subscription_details = serializers.SerializerMethodField()
+    subscription_details = SubscriptionSerializer(source='subscription', read_only=True)
     
     class Meta:
         model = Invoice
@@ -25,12 +31,38 @@ class InvoiceSerializer(serializers.ModelSerializer):
             'is_paid', 'paid_date', 'created_at'
         ]
         read_only_fields = ['invoice_number', 'gst_amount', 'total_amount', 'created_at']
+
+
+class InvoiceExportQuerySerializer(serializers.Serializer):
+    month = serializers.RegexField(r'^\d{4}-(0[1-9]|1[0-2])$', required=False)
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    is_paid = serializers.BooleanField(required=False, allow_null=True, default=None)
+    
+    def validate(self, data):
+        if data.get('month') and (data.get('start_date') or data.get('end_date')):
+            raise serializers.ValidationError("Use either month or start_date/end_date")
+        if data.get('start_date') and data.get('end_date') and data['end_date'] < data['start_date']:
+            raise serializers.ValidationError("End date must be on or after start date")
+        return data
     
-    def get_subscription_details(self, obj):
-        from subscriptions.serializers import SubscriptionSerializer
-        return SubscriptionSerializer(obj.subscription).data
+    def filter(self, queryset):
+        """Narrow an Invoice queryset to the requested invoice dates and paid status"""
+        data = self.validated_data
+        if data.get('month'):
+            year, month = map(int, data['month'].split('-'))
+            queryset = queryset.filter(invoice_date__year=year, invoice_date__month=month)
+        if data.get('start_date'):
+            queryset = queryset.filter(invoice_date__date__gte=data['start_date'])
+        if data.get('end_date'):
+            queryset = queryset.filter(invoice_date__date__lte=data['end_date'])
+        if data.get('is_paid') is not None:
+            queryset = queryset.filter(is_paid=data['is_paid'])
+        return queryset
 
 
 class ProcessPaymentSerializer(serializers.Serializer):
     subscription_id = serializers.UUIDField()
     payment_method = serializers.ChoiceField(choices=['upi', 'card', 'netbanking', 'wallet'])
+    # Same as the Idempotency-Key header, for clients that can't set headers
+    idempotency_key = serializers.CharField(max_length=255, required=False)
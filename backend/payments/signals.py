@@ -0,0 +1,112 @@
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.models import Product
+from rentkart_backend import counters
+from subscriptions.models import Subscription
+from subscriptions.signals import statuses_changed
+
+from .models import Invoice, Payment
+from .rollups import local_day, move_rentals, record_payment, record_rental
+
+
+EARNING_FIELDS = ('subscription__product__vendor_id', 'status', 'payment_date', 'created_at', 'amount')
+RENTAL_FIELDS = ('product__vendor_id', 'created_at', 'status')
+counters.track(Payment, *EARNING_FIELDS)
+counters.track(Subscription, *RENTAL_FIELDS)
+
+
+def _earning(vendor_id, status, payment_date, created_at, amount):
+    """The (vendor, day, amount) a payment contributes, or None if it isn't a success"""
+    if status != 'success' or vendor_id is None:
+        return None
+    return (vendor_id, local_day(payment_date or created_at), amount)
+
+
+def _current_earning(payment):
+    if payment.status != 'success':
+        return None
+    vendor_id = Subscription.objects.filter(pk=payment.subscription_id).values_list(
+        'product__vendor_id', flat=True
+    ).first()
+    return _earning(vendor_id, payment.status, payment.payment_date, payment.created_at, payment.amount)
+
+
+def _saved_earning(values):
+    if values is None or values['status'] != 'success':
+        return None
+    return _earning(*(values[field] for field in EARNING_FIELDS))
+
+
+@receiver(post_save, sender=Payment)
+def update_vendor_earnings(sender, instance, **kwargs):
+    previous = _saved_earning(counters.previous(instance))
+    # The saved row is only read when the payment counts
+    current = _saved_earning(counters.current(instance)) if instance.status == 'success' else None
+    if current == previous:
+        return
+    if previous:
+        record_payment(*previous, sign=-1)
+    if current:
+        record_payment(*current)
+
+
+@receiver(post_delete, sender=Payment)
+def remove_vendor_earning(sender, instance, **kwargs):
+    earning = _current_earning(instance)
+    if earning:
+        record_payment(*earning, sign=-1)
+
+
+@receiver(post_save, sender=Invoice)
+def queue_invoice_pdf(sender, instance, **kwargs):
+    """Pre-render the PDF once the invoice is committed; unchanged invoices are a cache hit"""
+    from .tasks import render_invoice_pdf
+    invoice_id = str(instance.pk)
+    transaction.on_commit(lambda: render_invoice_pdf.delay(invoice_id))
+
+
+def _rental(vendor_id, created_at, status):
+    return (vendor_id, local_day(created_at), status)
+
+
+def _current_rental(subscription):
+    vendor_id = Product.objects.filter(pk=subscription.product_id).values_list('vendor_id', flat=True).first()
+    return _rental(vendor_id, subscription.created_at, subscription.status)
+
+
+@receiver(post_save, sender=Subscription)
+def update_vendor_rentals(sender, instance, **kwargs):
+    values = counters.previous(instance)
+    previous = _rental(*(values[field] for field in RENTAL_FIELDS)) if values else None
+    current = _rental(*(counters.current(instance)[field] for field in RENTAL_FIELDS))
+    if current == previous:
+        return
+    if previous and previous[:2] == current[:2]:
+        move_rentals(*current[:2], previous[2], current[2])
+        return
+    if previous:
+        record_rental(*previous, sign=-1)
+    record_rental(*current)
+
+
+@receiver(post_delete, sender=Subscription)
+def remove_vendor_rental(sender, instance, **kwargs):
+    record_rental(*_current_rental(instance), sign=-1)
+
+
+@receiver(statuses_changed, sender=Subscription)
+def move_vendor_rentals(sender, ids, previous, status, **kwargs):
+    """Apply a bulk status change to the rollups, one delta per vendor and day"""
+    groups = (
+        Subscription.objects.filter(pk__in=ids)
+        .annotate(day=TruncDate('created_at'))
+        .values('product__vendor_id', 'day')
+        .annotate(count=Count('pk'))
+        .order_by()
+    )
+    for group in groups:
+        move_rentals(group['product__vendor_id'], group['day'], previous, status, group['count'])
@@ -0,0 +1,20 @@
+from celery import shared_task
+
+from .gateways import GatewayUnavailable
+from .invoice_pdf import prerender
+from .pipeline import advance
+
+
+@shared_task
+def render_invoice_pdf(invoice_id):
+    """Render and store an invoice's PDF ahead of its first download"""
+    return prerender(invoice_id)
+
+
+@shared_task(bind=True, max_retries=5)
+def process_payment(self, payment_id):
+    """Take a payment through the gateway to success or failed"""
+    try:
+        return advance(payment_id).status
+    except GatewayUnavailable as exc:
+        raise self.retry(exc=exc, countdown=2 ** self.request.retries)
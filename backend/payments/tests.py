@@ -0,0 +1,324 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from customers.models import Customer
+from products.models import Category, Product
+from subscriptions.models import Subscription
+from users.models import User
+from .invoice_numbers import BlockAllocator
+from .models import Invoice, Payment, RevenueLedgerEntry, VendorDailyStats
+from .pipeline import settle
+from .reconciliation import reconcile
+from .rollups import earnings_series
+from .tasks import process_payment
+
+
+class BillingHistoryQueryCountTests(TestCase):
+    """A page of a customer's payments or invoices is one query, whatever the customer has"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='customer@example.com', password='pw')
+        self.customer = Customer.objects.create(user=self.user)
+        self.client.force_authenticate(self.user)
+        self.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+        self.vendors = [
+            User.objects.create_user(email=f'vendor{i}@example.com', password='pw', role='vendor') for i in range(3)
+        ]
+
+    def create_invoices(self, count):
+        start = Subscription.objects.count()
+        for i in range(start, start + count):
+            product = Product.objects.create(
+                vendor=self.vendors[i % 3], category=self.categories[i % 3],
+                name=f'Product {i}', slug=f'product-{i}', description='Description',
+                daily_price=Decimal('100'),
+            )
+            subscription = Subscription.objects.create(
+                customer=self.customer, product=product, duration_type='daily',
+                start_date=date.today() + timedelta(days=1),
+            )
+            payment = Payment.objects.create(
+                subscription=subscription, payment_method='upi', amount=subscription.total_amount, status='success'
+            )
+            Invoice.objects.create(subscription=subscription, payment=payment, rental_amount=Decimal('100'))
+
+    def assert_single_query(self, url, page_size):
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), page_size)
+        return response
+
+    def test_history_pages(self):
+        for count, page_size in ((3, 3), (25, 20)):
+            self.create_invoices(count)
+            response = self.assert_single_query('/api/v1/payments/invoices/', page_size)
+            self.assertIn('product_details', response.data['results'][0]['subscription_details'])
+            self.assert_single_query('/api/v1/payments/history/', page_size)
+
+    def test_sparse_fields(self):
+        self.create_invoices(10)
+        response = self.assert_single_query('/api/v1/payments/invoices/?fields=id,invoice_number&page_size=5', 5)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'invoice_number'})
+        # The next page's cursor reads only loaded columns
+        self.assert_single_query(response.data['next'], 5)
+
+
+class EarningsSeriesTests(TestCase):
+    """Weekly and monthly periods sum the vendor's daily rows into one point"""
+
+    def test_week_interval(self):
+        vendor = User.objects.create_user(email='vendor@example.com', password='pw', role='vendor')
+        today = timezone.localdate()
+        monday = today - timedelta(days=today.weekday() + 7)
+        for offset, earnings, status in ((0, 10, 'pending'), (0, 0, 'active'), (1, 15, 'completed'), (2, 5, 'cancelled')):
+            row, _ = VendorDailyStats.objects.get_or_create(vendor=vendor, day=monday + timedelta(days=offset))
+            row.earnings += earnings
+            row.payments_count += 1 if earnings else 0
+            setattr(row, f'{status}_rentals', 1)
+            row.save()
+
+        series = earnings_series(vendor, 14, interval='week')
+        week = next(point for point in series if point['period'] == monday.isoformat())
+        self.assertEqual((week['earnings'], week['payments'], week['rentals']), (30, 3, 4))
+
+
+@override_settings(PAYMENT_GATEWAY_LATENCY=0, PAYMENT_GATEWAY_SUCCESS_RATE=1)
+class PaymentPipelineTests(TestCase):
+    """A payment is charged, invoiced and recognised once, however often it is requested or delivered"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='customer@example.com', password='pw')
+        self.client.force_authenticate(self.user)
+        vendor = User.objects.create_user(email='vendor@example.com', password='pw', role='vendor')
+        product = Product.objects.create(
+            vendor=vendor, category=Category.objects.create(name='Category'),
+            name='Product', slug='product', description='Description', daily_price=Decimal('100'),
+        )
+        self.subscription = Subscription.objects.create(
+            customer=Customer.objects.create(user=self.user), product=product, duration_type='daily',
+            start_date=date.today() + timedelta(days=1),
+        )
+
+    def pay(self, key='checkout-1'):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/v1/payments/process/',
+                {'subscription_id': str(self.subscription.id), 'payment_method': 'upi'},
+                format='json', HTTP_IDEMPOTENCY_KEY=key,
+            )
+        self.assertEqual(response.status_code, 202)
+        return Payment.objects.get(pk=response.data['payment']['id'])
+
+    def assert_fulfilled(self, payment):
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'active')
+        self.assertEqual(Invoice.objects.get().payment_id, payment.pk)
+        self.assertEqual(RevenueLedgerEntry.objects.count(), 1)
+
+    def test_same_idempotency_key(self):
+        payment = self.pay()
+        self.assertEqual(payment.status, 'success')
+        response = self.client.post(
+            '/api/v1/payments/process/',
+            {'subscription_id': str(self.subscription.id), 'payment_method': 'card'},
+            format='json', HTTP_IDEMPOTENCY_KEY='checkout-1',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['payment']['id'], str(payment.pk))
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assert_fulfilled(payment)
+
+    @override_settings(PAYMENT_GATEWAY_SUCCESS_RATE=0)
+    def test_decline(self):
+        payment = self.pay()
+        self.assertEqual(payment.status, 'failed')
+        self.assertTrue(payment.failure_reason)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.status, 'pending')
+        self.assertFalse(Invoice.objects.exists())
+        response = self.client.get(f'/api/v1/payments/{payment.pk}/status/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIs(response.data['success'], False)
+
+    def test_task_delivered_twice(self):
+        payment = self.pay()
+        self.assertEqual(process_payment.delay(str(payment.pk)).get(), 'success')
+        redelivered = Payment.objects.get(pk=payment.pk)
+        self.assertEqual((redelivered.status, redelivered.payment_date), ('success', payment.payment_date))
+        self.assert_fulfilled(payment)
+
+    def test_settle(self):
+        with override_settings(PAYMENT_GATEWAY_SUCCESS_RATE=0):
+            payment = self.pay()
+        captured_at = timezone.now() - timedelta(hours=2)
+        settled = settle(payment.pk, captured_at)
+        self.assertEqual((settled.status, settled.payment_date, settled.failure_reason), ('success', captured_at, ''))
+        self.assert_fulfilled(payment)
+        self.assertIsNone(settle(payment.pk, timezone.now()))
+        self.assertEqual(RevenueLedgerEntry.objects.count(), 1)
+
+
+class ReconciliationTests(TestCase):
+    """Settlement rows are matched, reported and corrected a chunk at a time"""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            user=User.objects.create_user(email='customer@example.com', password='pw')
+        )
+        vendor = User.objects.create_user(email='vendor@example.com', password='pw', role='vendor')
+        self.product = Product.objects.create(
+            vendor=vendor, category=Category.objects.create(name='Category'),
+            name='Product', slug='product', description='Description', daily_price=Decimal('100'),
+        )
+
+    def payment(self, status, hours_old=0):
+        subscription = Subscription.objects.create(
+            customer=self.customer, product=self.product, duration_type='daily',
+            start_date=date.today() + timedelta(days=1),
+        )
+        payment = Payment.objects.create(
+            subscription=subscription, payment_method='upi', amount=Decimal('100.00'), status=status,
+        )
+        if hours_old:
+            Payment.objects.filter(pk=payment.pk).update(created_at=timezone.now() - timedelta(hours=hours_old))
+        return payment
+
+    def reconcile(self, *lines, **kwargs):
+        settlement = 'transaction_id,amount,status,settled_at\n' + ''.join(f'{line}\n' for line in lines)
+        return reconcile(io.BytesIO(settlement.encode()), source='test.csv', **kwargs)
+
+    def issues(self, run):
+        return list(run.issue_set.values_list('kind', 'row', 'corrected'))
+
+    def test_duplicate_rows(self):
+        first, second = self.payment('success'), self.payment('success')
+        run = self.reconcile(
+            f'{first.transaction_id},100.00,settled,',
+            f'{first.transaction_id},100.00,settled,',
+            f'{second.transaction_id},100.00,settled,',
+            f'{first.transaction_id},100.00,settled,',
+            chunk_size=2,
+        )
+        # Line 3 repeats line 2 in the same chunk, line 5 repeats it from an earlier chunk
+        self.assertEqual(self.issues(run), [('duplicate_row', 3, False), ('duplicate_row', 5, False)])
+        self.assertEqual((run.rows, run.matched), (4, 2))
+        self.assertFalse(run.listings.exists())
+
+    def test_unknown_and_invalid_rows(self):
+        payment = self.payment('success')
+        run = self.reconcile(
+            'TXNUNKNOWN,100.00,settled,',
+            ',100.00,settled,',
+            f'{payment.transaction_id},lots,settled,',
+            f'{payment.transaction_id},100.00,refunded,',
+            f'{payment.transaction_id},100.00,settled,yesterday',
+        )
+        self.assertEqual(self.issues(run), [
+            ('invalid_row', 3, False), ('invalid_row', 4, False), ('invalid_row', 5, False),
+            ('invalid_row', 6, False), ('unknown_transaction', 2, False),
+        ])
+
+    def test_amount_mismatch_is_only_reported(self):
+        payment = self.payment('pending')
+        run = self.reconcile(f'{payment.transaction_id},90.00,settled,')
+        self.assertEqual(self.issues(run), [('amount_mismatch', 2, False)])
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.amount), ('pending', Decimal('100.00')))
+        self.assertEqual(payment.reconciled_at, run.started_at)
+
+    def test_settled_pending_payment_is_captured(self):
+        payment = self.payment('pending')
+        settled_at = timezone.now() - timedelta(hours=3)
+        run = self.reconcile(f'{payment.transaction_id},100.00,settled,{settled_at.isoformat()}')
+        self.assertEqual(self.issues(run), [('status_mismatch', 2, True)])
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.payment_date), ('success', settled_at))
+        self.assertEqual(payment.subscription.status, 'active')
+        self.assertEqual(Invoice.objects.get().payment_id, payment.pk)
+        entry = RevenueLedgerEntry.objects.get()
+        self.assertEqual((entry.amount, entry.occurred_at), (payment.amount, settled_at))
+
+    def test_orphaned_pending_payment_is_failed(self):
+        orphan, recent = self.payment('pending', hours_old=48), self.payment('pending')
+        run = self.reconcile(grace_hours=24)
+        self.assertEqual(self.issues(run), [('orphaned_pending', None, True)])
+        orphan.refresh_from_db()
+        recent.refresh_from_db()
+        self.assertEqual((orphan.status, recent.status), ('failed', 'pending'))
+
+    def test_dry_run_changes_no_payments(self):
+        captured, failed, mismatched = self.payment('success'), self.payment('pending'), self.payment('pending')
+        settled, orphan = self.payment('pending'), self.payment('pending', hours_old=48)
+        before = list(Payment.objects.order_by('pk').values())
+        run = self.reconcile(
+            f'{captured.transaction_id},100.00,settled,',
+            f'{failed.transaction_id},100.00,failed,',
+            f'{mismatched.transaction_id},90.00,settled,',
+            f'{settled.transaction_id},100.00,settled,',
+            dry_run=True, grace_hours=24,
+        )
+        self.assertEqual(list(Payment.objects.order_by('pk').values()), before)
+        self.assertFalse(Invoice.objects.exists())
+        self.assertEqual(sorted(self.issues(run)), [
+            ('amount_mismatch', 4, False), ('orphaned_pending', None, False),
+            ('status_mismatch', 3, False), ('status_mismatch', 5, False),
+        ])
+        self.assertEqual((run.matched, run.corrected), (1, 0))
+
+
+class InvoiceNumberTests(TestCase):
+    """Invoice numbers run per year without gaps, and blocks never overlap"""
+
+    def setUp(self):
+        customer = Customer.objects.create(user=User.objects.create_user(email='customer@example.com', password='pw'))
+        vendor = User.objects.create_user(email='vendor@example.com', password='pw', role='vendor')
+        product = Product.objects.create(
+            vendor=vendor, category=Category.objects.create(name='Category'),
+            name='Product', slug='product', description='Description', daily_price=Decimal('100'),
+        )
+        self.subscriptions = [
+            Subscription.objects.create(
+                customer=customer, product=product, duration_type='daily',
+                start_date=date.today() + timedelta(days=1),
+            )
+            for _ in range(4)
+        ]
+
+    def invoice(self, subscription, on=None):
+        with mock.patch('payments.invoice_numbers.timezone.localdate', return_value=on or date(2025, 6, 1)):
+            return Invoice.objects.create(subscription=subscription, rental_amount=Decimal('100')).invoice_number
+
+    def test_year_boundary(self):
+        numbers = [
+            self.invoice(subscription, on)
+            for subscription, on in zip(self.subscriptions, (date(2025, 12, 31),) * 2 + (date(2026, 1, 1),) * 2)
+        ]
+        self.assertEqual(numbers, ['INV-2025-00001', 'INV-2025-00002', 'INV-2026-00001', 'INV-2026-00002'])
+
+    def test_failed_save_returns_its_number(self):
+        self.assertEqual(self.invoice(self.subscriptions[0]), 'INV-2025-00001')
+        duplicate = Invoice(subscription=self.subscriptions[0], rental_amount=Decimal('100'))
+        with self.assertRaises(IntegrityError):
+            with mock.patch('payments.invoice_numbers.timezone.localdate', return_value=date(2025, 6, 1)):
+                duplicate.save()
+        self.assertEqual(duplicate.invoice_number, '')
+        self.assertEqual(self.invoice(self.subscriptions[1]), 'INV-2025-00002')
+
+    def test_blocks_are_distinct_across_allocators(self):
+        allocators = [BlockAllocator(3), BlockAllocator(3)]
+        numbers = []
+        for _ in range(4):
+            for allocator in allocators:
+                with self.captureOnCommitCallbacks(execute=True):
+                    numbers.append(allocator.next_number(2025))
+        self.assertEqual(numbers, [1, 4, 2, 5, 3, 6, 7, 10])
@@ -3,8 +3,10 @@ from . import views
 
 urlpatterns = [
     path('process/', views.process_payment, name='process-payment'),
+    path('<uuid:payment_id>/status/', views.payment_status, name='payment-status'),
     path('history/', views.payment_history, name='payment-history'),
     path('invoices/', views.invoice_list, name='invoice-list'),
     path('invoices/<uuid:invoice_id>/', views.invoice_detail, name='invoice-detail'),
     path('invoices/<uuid:invoice_id>/download/', views.download_invoice_pdf, name='download-invoice-pdf'),
+    path('admin/invoices/export/', views.admin_export_invoices, name='admin-export-invoices'),
 ]
\ No newline at end of file
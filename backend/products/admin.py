@@ -9,11 +9,7 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
     ordering = ['display_order', 'name']
-    
-    def product_count(self, obj):
-        """Show number of products in category"""
-        return obj.products.count()
-    product_count.short_description = 'Products'
+    readonly_fields = ['product_count']
 
 
 @admin.register(Product)
@@ -44,7 +40,7 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('quantity', 'available_quantity')
         }),
         ('Vendor & Location', {
-            'fields': ('vendor', 'city', 'state')
+            'fields': ('vendor', 'city', 'state', 'latitude', 'longitude')
         }),
         ('Media', {
             'fields': ('main_image',)
@@ -2,4 +2,12 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'products'
\ No newline at end of file
+    name = 'products'
+
+    def ready(self):
+        from django.core import checks
+        from django.db.models.signals import post_migrate
+        from . import signals, view_counts
+
+        post_migrate.connect(signals.install_search_index, sender=self)
+        checks.register(view_counts.check_view_count_buffer)
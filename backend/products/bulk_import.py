@@ -0,0 +1,216 @@
+"""
+Bulk product import from CSV or JSON.
+
+Rows are validated a chunk at a time against categories loaded once up front,
+so validation makes no queries per row. The valid rows of a chunk then get
+their slugs and derived prices in one pass, with a query for the slugs
+already taken rather than one per row, and are inserted with one bulk_create in their own
+transaction. Rows that fail are reported by row number and the rest of the
+file is still imported.
+
+bulk_create skips Product.save() and the product signals, so the geohash,
+category counts and cached catalog responses are kept up to date here. The
+search index triggers run on INSERT and need nothing extra.
+"""
+
+import csv
+import io
+import json
+from collections import Counter
+from itertools import islice
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils.text import slugify
+from rest_framework import serializers
+
+from . import geo, response_cache
+from .models import Category, Product
+
+
+IMPORT_FORMATS = ('csv', 'json')
+BATCH_SIZE = 500
+# Keeps the OR of slug prefixes in one query well inside SQLite's expression depth limit
+SLUG_QUERY_SIZE = 100
+
+
+class ProductImportSerializer(serializers.ModelSerializer):
+    """One imported row; `category` is a category slug or id"""
+    category = serializers.CharField()
+    # Uniqueness is settled by assign_slugs(), not a query per row
+    slug = serializers.SlugField(max_length=300, required=False, allow_blank=True)
+
+    class Meta:
+        model = Product
+        fields = [
+            'name', 'slug', 'description', 'category',
+            'daily_price', 'weekly_price', 'monthly_price', 'security_deposit',
+            'quantity', 'available_quantity',
+            'city', 'state', 'latitude', 'longitude',
+            'is_active', 'is_featured',
+        ]
+
+    def validate_category(self, value):
+        category_id = self.context['categories'].get(value.strip())
+        if category_id is None:
+            raise serializers.ValidationError('Unknown category')
+        return category_id
+
+
+def get_import_format(name, content_type=''):
+    """'csv' or 'json' from a file name or content type, or None"""
+    name = (name or '').lower()
+    for import_format in IMPORT_FORMATS:
+        if name.endswith(f'.{import_format}') or import_format in (content_type or ''):
+            return import_format
+    return None
+
+
+def read_rows(file, import_format):
+    """
+    Rows of a binary file as dicts. CSV is read a line at a time; blank cells
+    count as missing so optional columns can be left empty.
+    """
+    if import_format == 'csv':
+        return _csv_rows(file)
+
+    try:
+        rows = json.load(file)
+    except UnicodeDecodeError:
+        raise ValueError('The file is not UTF-8 encoded')
+    except json.JSONDecodeError as exc:
+        raise ValueError(f'Invalid JSON: {exc}')
+    if isinstance(rows, dict):
+        rows = rows.get('products')
+    if not isinstance(rows, list):
+        raise ValueError('Expected a JSON list of products or {"products": [...]}')
+    return iter(rows)
+
+
+def _csv_rows(file):
+    reader = csv.DictReader(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''))
+    try:
+        for row in reader:
+            yield {key.strip(): value for key, value in row.items() if key and value not in ('', None)}
+    except UnicodeDecodeError:
+        raise ValueError('The file is not UTF-8 encoded')
+    except csv.Error as exc:
+        raise ValueError(f'Invalid CSV on line {reader.line_num}: {exc}')
+
+
+def _category_lookup():
+    categories = {}
+    for pk, slug in Category.objects.values_list('pk', 'slug'):
+        categories[slug] = pk
+        categories[str(pk)] = pk
+    return categories
+
+
+def assign_slugs(products):
+    """Give each product a unique slug, suffixing `-2`, `-3`... on collisions"""
+    for product in products:
+        product.slug = (product.slug or slugify(product.name))[:290] or 'product'
+
+    counts = Counter(product.slug for product in products)
+    bases = sorted(counts)
+    taken = set(Product.objects.filter(slug__in=bases).values_list('slug', flat=True))
+    # A base repeated in the batch gets suffixes too, so look up its `base-N` slugs even if it is free
+    collided = [base for base in bases if base in taken or counts[base] > 1]
+    for start in range(0, len(collided), SLUG_QUERY_SIZE):
+        prefixes = Q()
+        for base in collided[start:start + SLUG_QUERY_SIZE]:
+            prefixes |= Q(slug__startswith=f'{base}-')
+        taken.update(Product.objects.filter(prefixes).values_list('slug', flat=True))
+
+    for product in products:
+        base = slug = product.slug
+        suffix = 1
+        while slug in taken:
+            suffix += 1
+            slug = f'{base}-{suffix}'
+        taken.add(slug)
+        product.slug = slug
+
+
+def build_products(rows, vendor):
+    """Unsaved products for validated rows, with the fields Product.save() would derive"""
+    products = []
+    for data in rows:
+        daily = data['daily_price']
+        weekly, monthly = Product.default_prices(daily)
+        latitude, longitude = data.get('latitude'), data.get('longitude')
+        products.append(Product(
+            vendor=vendor,
+            category_id=data.pop('category'),
+            weekly_price=data.pop('weekly_price', None) or weekly,
+            monthly_price=data.pop('monthly_price', None) or monthly,
+            available_quantity=data.pop('available_quantity', data.get('quantity', 1)),
+            geohash=(
+                geo.encode(float(latitude), float(longitude))
+                if latitude is not None and longitude is not None else ''
+            ),
+            **data,
+        ))
+    return products
+
+
+def import_products(rows, vendor, batch_size=BATCH_SIZE):
+    """
+    Validate and insert `rows` for `vendor` in batches of `batch_size`.
+    Returns {'created', 'failed', 'errors'}, with errors keyed by 1-based row number.
+    """
+    context = {'categories': _category_lookup()}
+    created = 0
+    errors = []
+    category_ids = set()
+
+    rows = iter(rows)
+    row_number = 0
+    read_error = None
+    while read_error is None:
+        chunk = []
+        try:
+            chunk.extend(islice(rows, batch_size))
+        except ValueError as exc:
+            # Unreadable from here on: import the rows read so far and stop
+            read_error = exc
+        if not chunk and read_error is None:
+            break
+
+        valid = []
+        numbers = []
+        for row in chunk:
+            row_number += 1
+            if not isinstance(row, dict):
+                errors.append({'row': row_number, 'errors': {'non_field_errors': ['Expected an object']}})
+                continue
+            serializer = ProductImportSerializer(data=row, context=context)
+            if serializer.is_valid():
+                valid.append(dict(serializer.validated_data))
+                numbers.append(row_number)
+            else:
+                errors.append({'row': row_number, 'errors': serializer.errors})
+        if read_error is not None:
+            errors.append({'row': row_number + 1, 'errors': {'non_field_errors': [str(read_error)]}})
+        if not valid:
+            continue
+
+        products = build_products(valid, vendor)
+        try:
+            with transaction.atomic():
+                assign_slugs(products)
+                Product.objects.bulk_create(products)
+        except IntegrityError as exc:
+            # A concurrent insert took one of the slugs; the batch is rolled back as a whole
+            errors.extend({'row': number, 'errors': {'non_field_errors': [str(exc)]}} for number in numbers)
+            continue
+        created += len(products)
+        category_ids.update(product.category_id for product in products)
+
+    if created:
+        Category.refresh_product_counts(category_ids)
+        slugs = Category.objects.filter(pk__in=category_ids).values_list('slug', flat=True)
+        response_cache.invalidate('categories', 'products', *(f'category:{slug}' for slug in slugs))
+
+    errors.sort(key=lambda error: error['row'])
+    return {'created': created, 'failed': len(errors), 'errors': errors}
@@ -0,0 +1,89 @@
+"""
+Facet counts for the product listing.
+
+All facets come from a single GROUP BY over (category, city, is_featured,
+price bucket) on the filtered queryset. Each row is one combination that
+actually occurs, so the result stays small, and the per-facet counts are
+summed from it in Python.
+"""
+
+from collections import Counter
+
+from django.db.models import Case, CharField, Count, Value, When
+
+
+# Lower bounds of the daily price buckets; the last bucket is open-ended
+PRICE_BUCKETS = (0, 500, 1000, 2500, 5000)
+
+
+def price_bucket_labels():
+    bounds = list(PRICE_BUCKETS)
+    labels = [f'{low}-{high}' for low, high in zip(bounds, bounds[1:])]
+    labels.append(f'{bounds[-1]}+')
+    return labels
+
+
+def price_bucket_expression():
+    labels = price_bucket_labels()
+    whens = [
+        When(daily_price__lt=high, then=Value(label))
+        for high, label in zip(PRICE_BUCKETS[1:], labels)
+    ]
+    return Case(*whens, default=Value(labels[-1]), output_field=CharField())
+
+
+def facet_counts(queryset):
+    """Counts per category, city, is_featured and daily price bucket for `queryset`"""
+    rows = (
+        queryset.order_by()
+        .annotate(price_bucket=price_bucket_expression())
+        .values('category_id', 'category__name', 'category__slug', 'city', 'is_featured', 'price_bucket')
+        .annotate(count=Count('pk'))
+    )
+
+    categories = {}
+    cities = Counter()
+    featured = Counter()
+    prices = Counter()
+    for row in rows:
+        count = row['count']
+        category = categories.setdefault(row['category_id'], {
+            'id': row['category_id'],
+            'name': row['category__name'],
+            'slug': row['category__slug'],
+            'count': 0,
+        })
+        category['count'] += count
+        if row['city']:
+            cities[row['city']] += count
+        featured[row['is_featured']] += count
+        prices[row['price_bucket']] += count
+
+    return {
+        'category': sorted(categories.values(), key=lambda c: (-c['count'], c['name'])),
+        'city': [
+            {'value': city, 'count': count}
+            for city, count in sorted(cities.items(), key=lambda item: (-item[1], item[0]))
+        ],
+        'is_featured': [
+            {'value': value, 'count': featured[value]} for value in (True, False)
+        ],
+        # Every bucket is listed, in price order, so the UI can render empty ones
+        'price': [
+            {'value': label, 'count': prices[label]} for label in price_bucket_labels()
+        ],
+    }
+
+
+class FacetCountsMixin:
+    """`?facets=true` adds facet counts for the current filter and search to a list response"""
+    facets_param = 'facets'
+
+    def wants_facets(self, request):
+        return request.query_params.get(self.facets_param, '').lower() in ('1', 'true', 'yes')
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.wants_facets(request):
+            response.data['facets'] = facet_counts(self.filter_queryset(self.get_queryset()))
+        return response
@@ -0,0 +1,119 @@
+"""
+Geohash index and radius search for products.
+
+Each product with coordinates stores its geohash. A radius query picks the
+geohash precision whose cells are at least as large as the radius, so the
+circle always fits inside the 3x3 block of cells around the centre. Those nine
+prefixes become indexed range scans. The database then computes haversine
+distances for the candidates only, filters on them and sorts by them.
+"""
+
+import math
+
+from django.db.models import FloatField, Q, Value
+from django.db.models.functions import ASin, Cast, Cos, Power, Radians, Sin, Sqrt
+from rest_framework import filters, serializers
+
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.32
+STORED_PRECISION = 9
+MAX_RADIUS_KM = 500
+
+
+def encode(latitude, longitude, precision=STORED_PRECISION):
+    lat_range, lng_range = [-90.0, 90.0], [-180.0, 180.0]
+    bits, bit_count, even = 0, 0, True
+    geohash = []
+    while len(geohash) < precision:
+        value, interval = (longitude, lng_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits, bit_count = 0, 0
+    return ''.join(geohash)
+
+
+def cell_size(precision):
+    """(latitude degrees, longitude degrees) covered by one cell"""
+    lng_bits = (precision * 5 + 1) // 2
+    lat_bits = precision * 5 // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def covering_prefixes(latitude, longitude, radius_km):
+    """Geohash prefixes of the 3x3 block of cells that contains the search circle"""
+    # Longitude degrees shrink towards the poles; size cells for the circle's poleward edge
+    edge_latitude = min(abs(latitude) + radius_km / KM_PER_DEGREE, 89.0)
+    km_per_lng_degree = KM_PER_DEGREE * math.cos(math.radians(edge_latitude))
+    precision = 1
+    for candidate in range(STORED_PRECISION, 0, -1):
+        lat_step, lng_step = cell_size(candidate)
+        if lat_step * KM_PER_DEGREE >= radius_km and lng_step * km_per_lng_degree >= radius_km:
+            precision = candidate
+            break
+
+    lat_step, lng_step = cell_size(precision)
+    prefixes = set()
+    for dlat in (-lat_step, 0, lat_step):
+        for dlng in (-lng_step, 0, lng_step):
+            lat = min(max(latitude + dlat, -90.0), 90.0)
+            lng = (longitude + dlng + 180.0) % 360.0 - 180.0
+            prefixes.add(encode(lat, lng, precision))
+    return sorted(prefixes)
+
+
+def distance_expression(latitude, longitude):
+    """Haversine distance in km from (latitude, longitude) to each product"""
+    lat = Radians(Cast('latitude', FloatField()))
+    lng = Radians(Cast('longitude', FloatField()))
+    origin_lat = Value(math.radians(latitude), output_field=FloatField())
+    origin_lng = Value(math.radians(longitude), output_field=FloatField())
+    cos_origin = Value(math.cos(math.radians(latitude)), output_field=FloatField())
+
+    haversine = (
+        Power(Sin((lat - origin_lat) / 2), 2)
+        + cos_origin * Cos(lat) * Power(Sin((lng - origin_lng) / 2), 2)
+    )
+    return Value(2 * EARTH_RADIUS_KM, output_field=FloatField()) * ASin(Sqrt(haversine))
+
+
+def within_radius(queryset, latitude, longitude, radius_km):
+    """Products within `radius_km`, annotated with `distance` (km)"""
+    cells = Q()
+    for prefix in covering_prefixes(latitude, longitude, radius_km):
+        # A closed range instead of LIKE, so every backend can use the btree index
+        last = prefix + 'z' * (STORED_PRECISION - len(prefix))
+        cells |= Q(geohash__range=(prefix, last))
+    return (
+        queryset.filter(cells)
+        .annotate(distance=distance_expression(latitude, longitude))
+        .filter(distance__lte=radius_km)
+    )
+
+
+class NearbyQuerySerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lng = serializers.FloatField(min_value=-180, max_value=180)
+    radius_km = serializers.FloatField(min_value=0.1, max_value=MAX_RADIUS_KM, default=10)
+
+
+class ProductDistanceFilter(filters.BaseFilterBackend):
+    """`?lat=&lng=[&radius_km=]` keeps products within the radius, nearest first"""
+
+    def filter_queryset(self, request, queryset, view):
+        if 'lat' not in request.query_params and 'lng' not in request.query_params:
+            return queryset
+        serializer = NearbyQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return within_radius(queryset, data['lat'], data['lng'], data['radius_km'])
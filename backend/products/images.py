@@ -0,0 +1,144 @@
+"""
+Responsive image variants for product and category images.
+
+Each image is stored once and its variant URLs (thumbnail, card, full) are
+computed when it is uploaded and saved on the row, so serializers never build
+URLs per request. The Cloudinary store derives variants with URL
+transformations; the local store writes resized copies under MEDIA_ROOT so
+development and tests work without a Cloudinary account.
+"""
+
+import os
+import threading
+import uuid
+
+from cloudinary import uploader
+from cloudinary.models import CloudinaryResource
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+
+VARIANTS = {
+    'thumbnail': {'width': 160, 'height': 160, 'crop': 'fill'},
+    'card': {'width': 480, 'height': 360, 'crop': 'fill'},
+    'full': {'width': 1600, 'height': 1600, 'crop': 'limit'},
+}
+
+
+class CloudinaryImageStore:
+    """Uploads to Cloudinary; variants are transformation URLs on the same asset"""
+
+    def upload(self, file, folder):
+        return uploader.upload_resource(file, type='upload', resource_type='image', folder=folder)
+
+    def variant_urls(self, resource):
+        return {
+            name: resource.build_url(
+                secure=True, gravity='auto', quality='auto', fetch_format='auto', **options
+            )
+            for name, options in VARIANTS.items()
+        }
+
+
+class LocalImageStore:
+    """
+    Writes the variants as JPEG files under MEDIA_ROOT/images/<public_id>/.
+    Images already sitting in MEDIA_ROOT from before variants existed are
+    rendered the first time their URLs are asked for.
+    """
+    format = 'jpg'
+
+    def __init__(self, media_root, media_url):
+        self.media_root = media_root
+        self.root = os.path.join(media_root, 'images')
+        self.url = f'{media_url}images/'
+
+    def _path(self, public_id, name):
+        return os.path.join(self.root, public_id, f'{name}.{self.format}')
+
+    def _render(self, file, public_id):
+        from PIL import Image, ImageOps
+
+        if hasattr(file, 'seekable') and file.seekable():
+            file.seek(0)
+        with Image.open(file) as original:
+            original = ImageOps.exif_transpose(original).convert('RGB')
+            for name, options in VARIANTS.items():
+                size = (options['width'], options['height'])
+                if options['crop'] == 'fill':
+                    variant = ImageOps.fit(original, size)
+                else:
+                    variant = original.copy()
+                    variant.thumbnail(size)
+                path = self._path(public_id, name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                variant.save(path, 'JPEG', quality=85, optimize=True)
+
+    def upload(self, file, folder):
+        public_id = f'{folder}/{uuid.uuid4().hex}'
+        self._render(file, public_id)
+        return CloudinaryResource(public_id, format=self.format, type='upload', resource_type='image')
+
+    def variant_urls(self, resource):
+        public_id = resource.public_id
+        if not os.path.exists(self._path(public_id, 'full')):
+            filename = f'{public_id}.{resource.format}' if resource.format else public_id
+            original = os.path.join(self.media_root, filename)
+            if not os.path.exists(original):
+                return {}
+            with open(original, 'rb') as file:
+                self._render(file, public_id)
+        return {
+            name: f'{self.url}{public_id}/{name}.{self.format}'
+            for name in VARIANTS
+        }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_image_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if settings.IMAGE_STORE == 'cloudinary':
+                    _store = CloudinaryImageStore()
+                else:
+                    _store = LocalImageStore(settings.MEDIA_ROOT, settings.MEDIA_URL)
+    return _store
+
+
+def refresh_variants(instance, field_name, folder):
+    """
+    Upload a newly assigned image through the configured store and recompute
+    `instance.image_variants` when the stored image has changed.
+    """
+    store = get_image_store()
+    value = getattr(instance, field_name)
+    if isinstance(value, UploadedFile):
+        value = store.upload(value, folder)
+        setattr(instance, field_name, value)
+
+    if not value:
+        instance.image_variants = {}
+        return
+
+    source = value.get_prep_value() if isinstance(value, CloudinaryResource) else str(value)
+    if instance.image_variants.get('source') == source:
+        return
+    if not isinstance(value, CloudinaryResource):
+        value = instance._meta.get_field(field_name).to_python(value)
+    instance.image_variants = {'source': source, **store.variant_urls(value)}
+
+
+def variant_url(instance, field_name, variant):
+    """Stored variant URL, or the original's URL for rows saved before variants existed"""
+    url = instance.image_variants.get(variant)
+    if url:
+        return url
+    image = getattr(instance, field_name)
+    if image:
+        return image.url
+    return None
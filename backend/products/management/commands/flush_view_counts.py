@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.view_counts import get_view_count_buffer
+
+
+class Command(BaseCommand):
+    help = 'Write buffered product view counts back to the database'
+
+    def handle(self, *args, **options):
+        applied = get_view_count_buffer().flush()
+        self.stdout.write(self.style.SUCCESS(f'Applied {applied} buffered views'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk_import import BATCH_SIZE, get_import_format, import_products, read_rows
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Create products in bulk for a vendor from a CSV or JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--vendor', required=True, help='Email of the vendor the products belong to')
+        parser.add_argument('--format', choices=['csv', 'json'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            vendor = User.objects.get(email=options['vendor'], role='vendor')
+        except User.DoesNotExist:
+            raise CommandError(f"No vendor with email {options['vendor']}")
+
+        import_format = options['format'] or get_import_format(options['path'])
+        if import_format is None:
+            raise CommandError('Pass --format or use a .csv / .json file')
+
+        with open(options['path'], 'rb') as file:
+            try:
+                rows = read_rows(file, import_format)
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            result = import_products(rows, vendor, batch_size=options['batch_size'])
+
+        for error in result['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(f"Created {result['created']} products, {result['failed']} rows failed"))
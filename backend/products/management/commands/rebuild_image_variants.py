@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from products import images
+from products.models import Category, Product
+from products.response_cache import invalidate
+
+
+class Command(BaseCommand):
+    help = 'Recompute the stored image variant URLs of categories and products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model, field_name, folder in (
+            (Category, 'image', 'categories'),
+            (Product, 'main_image', 'products'),
+        ):
+            batch = []
+            updated = 0
+            for instance in model.objects.exclude(**{f'{field_name}__isnull': True}).exclude(**{field_name: ''}).iterator(chunk_size=batch_size):
+                instance.image_variants = {}
+                images.refresh_variants(instance, field_name, folder)
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    model.objects.bulk_update(batch, ['image_variants'])
+                    updated += len(batch)
+                    batch = []
+            if batch:
+                model.objects.bulk_update(batch, ['image_variants'])
+                updated += len(batch)
+            self.stdout.write(f'{model._meta.verbose_name_plural}: {updated} updated')
+
+        # bulk_update skips the signals that normally drop cached catalog responses
+        invalidate('categories', 'products')
+        self.stdout.write(self.style.SUCCESS('Image variants rebuilt'))
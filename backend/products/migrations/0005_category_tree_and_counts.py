@@ -0,0 +1,63 @@
+# Generated by Django 5.2.12 on 2026-10-18 12:39
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def backfill_tree_and_counts(apps, schema_editor):
+    Category = apps.get_model("products", "Category")
+    Product = apps.get_model("products", "Product")
+
+    children = defaultdict(list)
+    for category in Category.objects.order_by("display_order", "name"):
+        children[category.parent_id].append(category)
+
+    counter = 0
+
+    def visit(node, depth):
+        nonlocal counter
+        counter += 1
+        node.lft, node.depth = counter, depth
+        for child in children[node.pk]:
+            visit(child, depth + 1)
+        counter += 1
+        node.rgt = counter
+        node.product_count = Product.objects.filter(
+            category_id=node.pk, is_active=True
+        ).count()
+        node.save(update_fields=["lft", "rgt", "depth", "product_count"])
+
+    for root in children[None]:
+        visit(root, 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0004_product_keyset_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="depth",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="lft",
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="product_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="rgt",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_tree_and_counts, migrations.RunPython.noop),
+    ]
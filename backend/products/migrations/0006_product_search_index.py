@@ -0,0 +1,71 @@
+from django.db import migrations
+
+
+# The sync triggers are (re)installed after every migrate by
+# products.search.install_search_triggers, because SQLite drops them
+# whenever a later migration rebuilds products_product.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE products_product_fts USING fts5(
+        product_id UNINDEXED, name, description, city,
+        tokenize = 'porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO products_product_fts (product_id, name, description, city)
+    SELECT id, name, description, city FROM products_product
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TRIGGER IF EXISTS products_product_fts_insert",
+    "DROP TRIGGER IF EXISTS products_product_fts_update",
+    "DROP TRIGGER IF EXISTS products_product_fts_delete",
+    "DROP TABLE IF EXISTS products_product_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE products_product ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(city, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX product_search_vector_idx ON products_product USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS product_search_vector_idx",
+    "ALTER TABLE products_product DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def run_for_vendor(sqlite_statements, postgres_statements):
+    def operation(apps, schema_editor):
+        vendor = schema_editor.connection.vendor
+        if vendor == "sqlite":
+            statements = sqlite_statements
+        elif vendor == "postgresql":
+            statements = postgres_statements
+        else:
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0005_category_tree_and_counts"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(SQLITE_FORWARD, POSTGRES_FORWARD),
+            run_for_vendor(SQLITE_REVERSE, POSTGRES_REVERSE),
+        ),
+    ]
@@ -1,10 +1,15 @@
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from users.models import User
 from django.utils.text import slugify
 import uuid
+from collections import defaultdict
 from decimal import Decimal, ROUND_HALF_UP
 from cloudinary.models import CloudinaryField
 
+from . import geo, images
+
 class Category(models.Model):
     """Product categories"""
     
@@ -13,6 +18,8 @@ class Category(models.Model):
     slug = models.SlugField(max_length=200, unique=True, blank=True)
     description = models.TextField(blank=True)
     image = CloudinaryField('image', null=True, blank=True)
+    # Variant URLs of `image`, computed on upload (see products.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     
     # Hierarchy support (for subcategories)
     parent = models.ForeignKey(
@@ -25,6 +32,15 @@ class Category(models.Model):
     
     is_active = models.BooleanField(default=True)
     display_order = models.IntegerField(default=0)
+    
+    # Nested-set columns, maintained by rebuild_tree()
+    lft = models.PositiveIntegerField(default=0, db_index=True, editable=False)
+    rgt = models.PositiveIntegerField(default=0, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Active products directly in this category, maintained by refresh_product_counts()
+    product_count = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -41,7 +57,60 @@ class Category(models.Model):
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.name)
+        images.refresh_variants(self, 'image', 'categories')
         super().save(*args, **kwargs)
+    
+    def get_descendants(self):
+        """All categories below this one, in tree order"""
+        return Category.objects.filter(lft__gt=self.lft, rgt__lt=self.rgt).order_by('lft')
+    
+    @classmethod
+    def rebuild_tree(cls):
+        """Renumber the nested-set columns from the `parent` links"""
+        nodes = list(cls.objects.only('id', 'parent_id', 'name', 'display_order', 'lft', 'rgt', 'depth'))
+        children = defaultdict(list)
+        for node in nodes:
+            children[node.parent_id].append(node)
+        
+        changed = []
+        counter = 0
+        # Iterative depth-first walk: (node, depth, visited-children flag)
+        stack = [(root, 0, False) for root in reversed(children[None])]
+        while stack:
+            node, depth, closing = stack.pop()
+            counter += 1
+            if closing:
+                if node.rgt != counter:
+                    node.rgt = counter
+                    changed.append(node)
+                continue
+            if node.lft != counter or node.depth != depth:
+                node.lft, node.depth = counter, depth
+                changed.append(node)
+            stack.append((node, depth, True))
+            stack.extend((child, depth + 1, False) for child in reversed(children[node.pk]))
+        
+        cls.objects.bulk_update(set(changed), ['lft', 'rgt', 'depth'], batch_size=500)
+    
+    @classmethod
+    def refresh_product_counts(cls, category_ids=None):
+        """Recompute the denormalized active product counts with one UPDATE"""
+        active_products = Product.objects.filter(
+            category=OuterRef('pk'), is_active=True
+        ).order_by().values('category').annotate(total=Count('pk')).values('total')
+        
+        categories = cls.objects.all()
+        if category_ids is not None:
+            categories = categories.filter(pk__in=[pk for pk in category_ids if pk])
+        categories.update(product_count=Coalesce(Subquery(active_products), 0))
+    
+    @staticmethod
+    def build_tree(categories):
+        """Group categories by parent id, keeping their order"""
+        children = defaultdict(list)
+        for category in categories:
+            children[category.parent_id].append(category)
+        return children
 
 
 
@@ -77,10 +146,15 @@ class Product(models.Model):
 
     # Images
     main_image = CloudinaryField('image', null=True, blank=True)
+    # Variant URLs of `main_image`, computed on upload (see products.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     # Location
     city = models.CharField(max_length=100, blank=True)
     state = models.CharField(max_length=100, blank=True)
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     # Status
     is_active = models.BooleanField(default=True)
@@ -97,6 +171,12 @@ class Product(models.Model):
         verbose_name = 'Product'
         verbose_name_plural = 'Products'
         ordering = ['-created_at']
+        # Keyset pagination seeks on (ordering field, id)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='product_created_id_idx'),
+            models.Index(fields=['daily_price', 'id'], name='product_price_id_idx'),
+            models.Index(fields=['view_count', 'id'], name='product_views_id_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -106,24 +186,33 @@ class Product(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
 
+        # Keep the geohash index in step with the coordinates
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = geo.encode(float(self.latitude), float(self.longitude))
+        else:
+            self.geohash = ''
+
+        images.refresh_variants(self, 'main_image', 'products')
+
         # Auto-calculate pricing (Decimal-safe, industry standard)
         if self.daily_price:
-            daily = self.daily_price
-
-            # Weekly price → ~25% discount
+            weekly, monthly = self.default_prices(self.daily_price)
             if not self.weekly_price:
-                self.weekly_price = (
-                    daily * Decimal('7') * Decimal('0.75')
-                ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-
-            # Monthly price → ~60% discount
+                self.weekly_price = weekly
             if not self.monthly_price:
-                self.monthly_price = (
-                    daily * Decimal('30') * Decimal('0.40')
-                ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+                self.monthly_price = monthly
 
         super().save(*args, **kwargs)
 
+    @staticmethod
+    def default_prices(daily):
+        """(weekly, monthly) prices derived from the daily price"""
+        # Weekly price → ~25% discount
+        weekly = (daily * Decimal('7') * Decimal('0.75')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        # Monthly price → ~60% discount
+        monthly = (daily * Decimal('30') * Decimal('0.40')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return weekly, monthly
+
     @property
     def is_available(self):
         """Check if product is available for rent"""
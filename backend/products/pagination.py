@@ -0,0 +1,128 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    """
+    Keyset pagination for the public catalog.
+
+    The cursor stores the values of every ordering field plus the product id,
+    so each page is fetched with a `WHERE (ordering, id) > (cursor)` seek
+    instead of an OFFSET, and deep pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = '-created_at'
+    tiebreaker = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        fields = [field.lstrip('-') for field in ordering]
+        if self.tiebreaker in fields or 'pk' in fields:
+            return ordering
+        # Follow the direction of the primary key so ties keep a stable order
+        prefix = '-' if ordering[0].startswith('-') else ''
+        return tuple(ordering) + (prefix + self.tiebreaker,)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor.reverse, self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*self._reversed(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            try:
+                queryset = queryset.filter(self._seek(current_position, reverse))
+            except (ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        # Fetch one extra row to find out whether another page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+
+        has_following_position = len(results) > len(self.page)
+        following_position = None
+        if has_following_position:
+            following_position = self._get_position_from_instance(self.page[-1], self.ordering)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = current_position is not None
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        # Keys are unique, so the next page starts right after the last row shown
+        position = self.next_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.previous_position
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _seek(self, position, reverse):
+        """Build the row-value comparison `(f1, f2, ..., id) > (v1, v2, ..., id)`"""
+        values = json.loads(position)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError('Cursor does not match the current ordering')
+
+        seek = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            attr = order.lstrip('-')
+            lookup = 'lt' if reverse != order.startswith('-') else 'gt'
+            seek |= Q(**equal, **{f'{attr}__{lookup}': value})
+            equal[attr] = value
+        return seek
+
+    def _reversed(self, ordering):
+        return tuple(order[1:] if order.startswith('-') else '-' + order for order in ordering)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            attr = order.lstrip('-')
+            value = instance[attr] if isinstance(instance, dict) else getattr(instance, attr)
+            values.append(str(value))
+        return json.dumps(values)
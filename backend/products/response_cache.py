@@ -0,0 +1,117 @@
+"""
+Response cache for anonymous catalog reads.
+
+Cached entries are keyed on the request host and path, the normalized query
+string and the current version of every namespace the response depends on.
+Invalidating a namespace (see products.signals) bumps its version, which
+orphans exactly the entries built from it; they then age out of the cache.
+"""
+
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+KEY_PREFIX = 'catalog'
+HITS_KEY = f'{KEY_PREFIX}:stats:hits'
+MISSES_KEY = f'{KEY_PREFIX}:stats:misses'
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def _incr(key):
+    cache = get_cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(key, 1, timeout=None)
+
+
+def normalize_query(query_params):
+    """Sorted, de-duplicated query string without empty values"""
+    pairs = sorted(
+        (key, value)
+        for key in query_params
+        for value in set(query_params.getlist(key))
+        if value != ''
+    )
+    return urlencode(pairs)
+
+
+def make_key(namespaces, request):
+    cache = get_cache()
+    version_keys = [_version_key(namespace) for namespace in namespaces]
+    versions = cache.get_many(version_keys)
+    stamp = ','.join(f'{key}={versions.get(key, 0)}' for key in version_keys)
+    raw = f'{request.get_host()}{request.path}?{normalize_query(request.query_params)}|{stamp}'
+    return f'{KEY_PREFIX}:response:{hashlib.md5(raw.encode()).hexdigest()}'
+
+
+def invalidate(*namespaces):
+    """Drop every cached response that depends on one of `namespaces`"""
+    for namespace in set(namespaces):
+        _incr(_version_key(namespace))
+
+
+def get_stats():
+    cache = get_cache()
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    hits = counters.get(HITS_KEY, 0)
+    misses = counters.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': round(hits / total, 4) if total else 0.0,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous GET requests from the catalog cache.
+
+    Views list the namespaces their response depends on in `cache_namespaces`
+    or override `get_cache_namespaces()` when they depend on URL kwargs.
+    """
+    cache_namespaces = ()
+
+    def get_cache_namespaces(self):
+        return self.cache_namespaces
+
+    def is_cacheable(self, request):
+        return settings.CATALOG_CACHE_ENABLED and not request.user.is_authenticated
+
+    def get(self, request, *args, **kwargs):
+        if not self.is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = make_key(self.get_cache_namespaces(), request)
+        data = cache.get(key)
+        if data is not None:
+            _incr(HITS_KEY)
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        _incr(MISSES_KEY)
+        response = super().get(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=settings.CATALOG_CACHE_TIMEOUT)
+        response['X-Cache'] = 'MISS'
+        return response
@@ -0,0 +1,127 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+
+FTS_TABLE = 'products_product_fts'
+
+# Column weights: name matters most, then city, then description
+SQLITE_RANK = f'bm25({FTS_TABLE}, 0.0, 10.0, 1.0, 2.0)'
+POSTGRES_RANK = '-ts_rank(products_product.search_vector, to_tsquery(\'english\', %s))'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SQLITE_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON products_product BEGIN
+        INSERT INTO {FTS_TABLE} (product_id, name, description, city)
+        VALUES (new.id, new.name, new.description, new.city);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF name, description, city ON products_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE product_id = old.id;
+        INSERT INTO {FTS_TABLE} (product_id, name, description, city)
+        VALUES (new.id, new.name, new.description, new.city);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON products_product BEGIN
+        DELETE FROM {FTS_TABLE} WHERE product_id = old.id;
+    END
+    """,
+]
+
+
+def install_search_triggers(using='default'):
+    """Make sure the SQLite index follows every insert, update and delete on products"""
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or FTS_TABLE not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the SQLite index from products_product (Postgres keeps a generated column)"""
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    install_search_triggers(using)
+    with conn.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (product_id, name, description, city) '
+            'SELECT id, name, description, city FROM products_product'
+        )
+
+
+def search_tokens(terms):
+    return [token for term in terms for token in TOKEN_RE.findall(term)]
+
+
+def sqlite_query(tokens):
+    # Every token must match; the trailing * keeps search-as-you-type working
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def postgres_query(tokens):
+    return ' & '.join(f'{token}:*' for token in tokens)
+
+
+def search_products(queryset, tokens):
+    """
+    Restrict `queryset` to products matching every token, annotated with
+    `search_rank` (lower is more relevant). Returns None when the database
+    has no full-text index, so callers can fall back to `icontains`.
+    """
+    if connection.vendor == 'sqlite':
+        match = sqlite_query(tokens)
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.product_id = products_product.id', f'{FTS_TABLE} MATCH %s'],
+            params=[match],
+        ).annotate(search_rank=RawSQL(SQLITE_RANK, (), output_field=FloatField()))
+
+    if connection.vendor == 'postgresql':
+        match = postgres_query(tokens)
+        return queryset.extra(
+            where=["products_product.search_vector @@ to_tsquery('english', %s)"],
+            params=[match],
+        ).annotate(search_rank=RawSQL(POSTGRES_RANK, (match,), output_field=FloatField()))
+
+    return None
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """Full-text search over the product index, ranked by relevance"""
+
+    def filter_queryset(self, request, queryset, view):
+        tokens = search_tokens(self.get_search_terms(request))
+        if not tokens:
+            return queryset
+        results = search_products(queryset, tokens)
+        if results is None:
+            return super().filter_queryset(request, queryset, view)
+        return results
+
+
+class ProductOrderingFilter(filters.OrderingFilter):
+    """
+    Order nearby results by distance and search results by relevance, unless
+    the client asks for another ordering
+    """
+    implicit_orderings = ('distance', 'search_rank')
+
+    def get_ordering(self, request, queryset, view):
+        if not request.query_params.get(self.ordering_param):
+            annotations = queryset.query.annotations
+            for field in self.implicit_orderings:
+                if field in annotations:
+                    return [field]
+        return super().get_ordering(request, queryset, view)
@@ -1,40 +1,60 @@
 from rest_framework import serializers
+from rentkart_backend.eager_loading import EagerLoadingMixin
+from rentkart_backend.sparse_fields import SparseFieldsMixin
 from .models import Category, Product
+from .images import VARIANTS, variant_url
+
+
+def image_variant_urls(instance):
+    return {name: url for name, url in instance.image_variants.items() if name in VARIANTS}
 
 
 class CategorySerializer(serializers.ModelSerializer):
-    product_count = serializers.SerializerMethodField()
+    product_count = serializers.IntegerField(read_only=True)
     subcategories = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
     
     class Meta:
         model = Category
         fields = [
-            'id', 'name', 'slug', 'description', 'image',
+            'id', 'name', 'slug', 'description', 'image', 'images',
             'parent', 'is_active', 'display_order',
             'product_count', 'subcategories'
         ]
     
-    def get_product_count(self, obj):
-        return obj.products.filter(is_active=True).count()
-    
     def get_subcategories(self, obj):
-        if obj.subcategories.exists():
-            return CategorySerializer(
-                obj.subcategories.filter(is_active=True),
-                many=True,
-                context=self.context
-            ).data
+        # The active tree is loaded once and shared through the root context
+        tree = self.context.get('category_tree')
+        if tree is None:
+            tree = Category.build_tree(Category.objects.filter(is_active=True).order_by('lft'))
+            self.context['category_tree'] = tree
+        children = tree.get(obj.pk, [])
+        if children:
+            return CategorySerializer(children, many=True, context=self.context).data
         return []
+    
+    def get_images(self, obj):
+        return image_variant_urls(obj)
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Lightweight serializer for product listing"""
 
+    select_related_fields = ('category', 'vendor')
+    field_dependencies = {
+        'main_image': ('main_image', 'image_variants'),
+        'vendor_name': ('vendor__first_name', 'vendor__last_name', 'vendor__email'),
+        'is_available': ('is_active', 'available_quantity'),
+        # Annotated by `?lat=&lng=` queries, not a column
+        'distance_km': (),
+    }
+
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
     vendor_name = serializers.CharField(source='vendor.get_full_name', read_only=True)
 
     main_image = serializers.SerializerMethodField()
+    distance_km = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -43,18 +63,27 @@ class ProductListSerializer(serializers.ModelSerializer):
             'category', 'category_name', 'category_slug',
             'daily_price', 'weekly_price', 'monthly_price',
             'main_image', 'vendor_name', 'city',
-            'is_available', 'is_featured', 'created_at'
+            'is_available', 'is_featured', 'created_at',
+            'distance_km'
         ]
 
     def get_main_image(self, obj):
-        if obj.main_image:
-            return obj.main_image.url
-        return None
+        # Listings only need the card-sized variant
+        return variant_url(obj, 'main_image', 'card')
+
+    def get_distance_km(self, obj):
+        # Only set on `?lat=&lng=` queries
+        distance = getattr(obj, 'distance', None)
+        if distance is None:
+            return None
+        return round(distance, 2)
 
 
-class ProductDetailSerializer(serializers.ModelSerializer):
+class ProductDetailSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Complete serializer for product detail page"""
 
+    select_related_fields = ('category', 'vendor')
+
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_slug = serializers.CharField(source='category.slug', read_only=True)
     category_id = serializers.CharField(source='category.id', read_only=True)
@@ -64,6 +93,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
     vendor_id = serializers.CharField(source='vendor.id', read_only=True)
 
     main_image = serializers.SerializerMethodField()
+    images = serializers.SerializerMethodField()
 
     class Meta:
         model = Product
@@ -78,7 +108,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
 
             'quantity', 'available_quantity',
 
-            'main_image', 'city', 'state',
+            'main_image', 'images', 'city', 'state', 'latitude', 'longitude',
 
             'is_active', 'is_featured', 'is_available',
 
@@ -92,6 +122,7 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         ]
 
     def get_main_image(self, obj):
-        if obj.main_image:
-            return obj.main_image.url
-        return None
\ No newline at end of file
+        return variant_url(obj, 'main_image', 'full')
+
+    def get_images(self, obj):
+        return image_variant_urls(obj)
\ No newline at end of file
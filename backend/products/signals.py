@@ -0,0 +1,81 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import response_cache
+from .models import Category, Product
+from .search import install_search_triggers
+
+
+TREE_FIELDS = {'parent', 'display_order', 'name'}
+
+
+def _touches(update_fields, fields):
+    return update_fields is None or bool(fields & set(update_fields))
+
+
+def _category_namespaces(category_ids):
+    slugs = Category.objects.filter(pk__in=[pk for pk in category_ids if pk]).values_list('slug', flat=True)
+    return [f'category:{slug}' for slug in slugs]
+
+
+@receiver(pre_save, sender=Category)
+def remember_previous_slug(sender, instance, **kwargs):
+    instance._previous_slug = (
+        Category.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, update_fields=None, **kwargs):
+    """Keep the nested-set columns in step with the parent links"""
+    if _touches(update_fields, TREE_FIELDS):
+        Category.rebuild_tree()
+    # Category names and counts are embedded in every catalog response
+    response_cache.invalidate(
+        'categories', 'products',
+        f'category:{instance.slug}', f'category:{instance._previous_slug}',
+    )
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    Category.rebuild_tree()
+    response_cache.invalidate('categories', 'products', f'category:{instance.slug}')
+
+
+@receiver(pre_save, sender=Product)
+def remember_previous_state(sender, instance, **kwargs):
+    """Note the category, slug and status a product is moving away from"""
+    previous = Product.objects.filter(pk=instance.pk).values_list('category_id', 'slug', 'is_active').first()
+    instance._previous_state = previous
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    """Refresh category counts and cached catalog responses affected by the save"""
+    previous_category_id, previous_slug, was_active = instance._previous_state or (None, None, None)
+    category_ids = {instance.category_id, previous_category_id}
+    namespaces = ['products', f'product:{instance.slug}', f'product:{previous_slug}']
+    counts_changed = (
+        instance._previous_state is None
+        or previous_category_id != instance.category_id
+        or was_active != instance.is_active
+    )
+    if counts_changed:
+        Category.refresh_product_counts(category_ids)
+        namespaces.append('categories')
+    response_cache.invalidate(*namespaces, *_category_namespaces(category_ids))
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    Category.refresh_product_counts({instance.category_id})
+    response_cache.invalidate(
+        'categories', 'products', f'product:{instance.slug}',
+        *_category_namespaces({instance.category_id}),
+    )
+
+
+def install_search_index(sender, using='default', **kwargs):
+    """post_migrate hook: restore the search index triggers dropped by table rebuilds"""
+    install_search_triggers(using)
@@ -0,0 +1,13 @@
+from celery import shared_task
+
+from .view_counts import get_view_count_buffer
+
+
+@shared_task
+def flush_view_counts():
+    """
+    Write buffered product views back to the database. Only the Redis buffer
+    is reachable from beat; with the local one this flushes beat's own, empty
+    buffer and each web process flushes itself
+    """
+    return get_view_count_buffer().flush()
@@ -0,0 +1,46 @@
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from users.models import User
+from .models import Category, Product
+
+
+class CatalogQueryCountTests(TestCase):
+    """The catalog list views load every product's relations in a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(email='admin@example.com', password='pw', role='admin', is_superuser=True)
+        self.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+        self.vendor = User.objects.create_user(email='vendor@example.com', password='pw', role='vendor')
+
+    def create_products(self, count):
+        start = Product.objects.count()
+        for i in range(start, start + count):
+            Product.objects.create(
+                vendor=self.vendor, category=self.categories[i % 3],
+                name=f'Product {i}', slug=f'product-{i}', description='Description',
+                daily_price=Decimal('100'), city='Pune',
+            )
+
+    def assert_single_query(self, url, user=None):
+        """One query for the page at 1 product and again at 50"""
+        self.client.force_authenticate(user)
+        for count in (1, 49):
+            self.create_products(count)
+            cache.clear()
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+
+    def test_product_list(self):
+        self.assert_single_query('/api/v1/products/?page_size=50')
+
+    def test_vendor_products(self):
+        self.assert_single_query('/api/v1/products/vendor/products/', self.vendor)
+
+    def test_admin_all_products(self):
+        self.assert_single_query('/api/v1/auth/admin/products/', self.admin)
@@ -4,6 +4,7 @@ from . import views
 urlpatterns = [
     # Public routes
     path('categories/', views.CategoryListView.as_view(), name='category-list'),
+    path('categories/tree/', views.CategoryTreeView.as_view(), name='category-tree'),
     path('categories/<slug:slug>/', views.CategoryDetailView.as_view(), name='category-detail'),
     path('', views.ProductListView.as_view(), name='product-list'),
     path('category/<slug:category_slug>/', views.ProductsByCategoryView.as_view(), name='products-by-category'),
@@ -11,8 +12,10 @@ urlpatterns = [
     
     # Vendor routes
     path('vendor/stats/', views.vendor_dashboard_stats, name='vendor-stats'),
+    path('vendor/earnings/', views.vendor_earnings, name='vendor-earnings'),
     path('vendor/products/', views.vendor_products, name='vendor-products'),
     path('vendor/products/create/', views.vendor_create_product, name='vendor-create-product'),
+    path('vendor/products/import/', views.vendor_import_products, name='vendor-import-products'),
     path('vendor/products/<uuid:product_id>/', views.vendor_update_product, name='vendor-update-product'),
     path('vendor/rentals/', views.vendor_rentals, name='vendor-rentals'),
     
@@ -21,5 +24,7 @@ urlpatterns = [
     path('admin/categories/<uuid:category_id>/', views.admin_category_detail, name='admin-category-detail'),
     path('admin/products/create/', views.admin_create_product, name='admin-create-product'),
     path('admin/products/<uuid:product_id>/', views.admin_product_detail, name='admin-product-detail'),
+    path('admin/rentals/bulk-status/', views.admin_bulk_rental_status, name='admin-bulk-rental-status'),
     path('admin/rentals/<uuid:rental_id>/', views.admin_rental_action, name='admin-rental-action'),
+    path('admin/cache/stats/', views.admin_catalog_cache_stats, name='admin-catalog-cache-stats'),
 ]
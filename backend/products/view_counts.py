@@ -0,0 +1,152 @@
+"""
+Buffered product view counters.
+
+Product page views are counted in a buffer and written back in batches, so
+reading a product never writes its row. The Redis buffer is shared by every
+worker and survives restarts; the flush_view_counts beat task writes it back.
+
+The local buffer (the default without REDIS_URL) lives in process memory. It
+is flushed by the first request after VIEW_COUNT_FLUSH_SECONDS and at
+interpreter exit, never by beat, which runs in a process of its own, so its
+counts are lost if the process is killed. It is meant for development; outside
+DEBUG the `products.W001` system check and a log warning when the buffer is
+created say so.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core import checks
+from django.db import transaction
+from django.db.models import F
+
+
+logger = logging.getLogger(__name__)
+
+LOCAL_BUFFER_WARNING = (
+    "Product view counts are buffered in process memory (VIEW_COUNT_BUFFER = 'local'): the "
+    "flush_view_counts beat task can't reach them and they are lost when a worker is killed."
+)
+
+
+def apply_view_counts(counts):
+    """Add buffered views to products, one UPDATE per distinct increment"""
+    from .models import Product
+
+    by_increment = defaultdict(list)
+    for product_id, views in counts.items():
+        if views > 0:
+            by_increment[views].append(product_id)
+
+    with transaction.atomic():
+        for views, product_ids in by_increment.items():
+            Product.objects.filter(pk__in=product_ids).update(view_count=F('view_count') + views)
+    return sum(counts.values())
+
+
+class LocalViewCountBuffer:
+    """Per-process buffer, flushed by the request that finds it overdue"""
+
+    def __init__(self, flush_interval):
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        atexit.register(self.flush)
+
+    def increment(self, product_id):
+        with self._lock:
+            self._pending[str(product_id)] += 1
+            due = time.monotonic() - self._last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            counts, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        if not counts:
+            return 0
+        return apply_view_counts(counts)
+
+
+class RedisViewCountBuffer:
+    """
+    Shared buffer in a Redis hash.
+
+    A flush renames the live hash to a processing key and deletes each field
+    once its UPDATE has committed. A flush interrupted by a restart resumes
+    from the processing key, so at most one batch of increments can be
+    applied twice and none are lost.
+    """
+    key = 'rentkart:product_views'
+    processing_key = 'rentkart:product_views:flushing'
+    lock_key = 'rentkart:product_views:lock'
+
+    def __init__(self, url, flush_interval):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.flush_interval = flush_interval
+
+    def increment(self, product_id):
+        self.redis.hincrby(self.key, str(product_id), 1)
+
+    def flush(self):
+        import redis
+
+        lock = self.redis.lock(self.lock_key, timeout=self.flush_interval * 5)
+        if not lock.acquire(blocking=False):
+            # Another worker is already flushing
+            return 0
+        try:
+            if not self.redis.exists(self.processing_key):
+                try:
+                    self.redis.rename(self.key, self.processing_key)
+                except redis.ResponseError:
+                    # Nothing buffered since the last flush
+                    return 0
+
+            counts = {
+                field.decode(): int(views)
+                for field, views in self.redis.hgetall(self.processing_key).items()
+            }
+            applied = apply_view_counts(counts)
+            if counts:
+                self.redis.hdel(self.processing_key, *counts.keys())
+            return applied
+        finally:
+            lock.release()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_count_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                if settings.VIEW_COUNT_BUFFER == 'redis':
+                    _buffer = RedisViewCountBuffer(settings.REDIS_URL, settings.VIEW_COUNT_FLUSH_SECONDS)
+                else:
+                    if not settings.DEBUG:
+                        logger.warning(LOCAL_BUFFER_WARNING)
+                    _buffer = LocalViewCountBuffer(settings.VIEW_COUNT_FLUSH_SECONDS)
+    return _buffer
+
+
+def check_view_count_buffer(app_configs, **kwargs):
+    """System check: warn about the local buffer outside DEBUG"""
+    if settings.DEBUG or settings.VIEW_COUNT_BUFFER == 'redis':
+        return []
+    return [checks.Warning(
+        LOCAL_BUFFER_WARNING,
+        hint="Set REDIS_URL (or VIEW_COUNT_BUFFER = 'redis') so every worker shares one buffer.",
+        id='products.W001',
+    )]
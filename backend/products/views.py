@@ -1,15 +1,24 @@
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view, permission_classes, parser_classes
-from rest_framework.parsers import MultiPartParser, FormParser
+from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Category, Product
 from .serializers import CategorySerializer, ProductListSerializer, ProductDetailSerializer
+from .pagination import ProductCursorPagination
+from .search import ProductSearchFilter, ProductOrderingFilter
+from .geo import ProductDistanceFilter
+from .facets import FacetCountsMixin
+from .view_counts import get_view_count_buffer
+from .response_cache import CachedResponseMixin, get_stats
+from .bulk_import import get_import_format, import_products, read_rows
+from rentkart_backend.eager_loading import EagerLoadingViewMixin
 
 
-class CategoryListView(generics.ListCreateAPIView):
+class CategoryListView(CachedResponseMixin, generics.ListCreateAPIView):
     queryset = Category.objects.filter(is_active=True)
+    cache_namespaces = ('categories',)
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -18,6 +27,21 @@ class CategoryListView(generics.ListCreateAPIView):
     ordering = ['display_order', 'name']
 
 
+class CategoryTreeView(CachedResponseMixin, generics.ListAPIView):
+    """Navigation tree: root categories with nested subcategories, from one query"""
+    serializer_class = CategorySerializer
+    cache_namespaces = ('categories',)
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = None
+    
+    def list(self, request, *args, **kwargs):
+        tree = Category.build_tree(Category.objects.filter(is_active=True).order_by('lft'))
+        context = self.get_serializer_context()
+        context['category_tree'] = tree
+        serializer = CategorySerializer(tree.get(None, []), many=True, context=context)
+        return Response(serializer.data)
+
+
 class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -25,10 +49,12 @@ class CategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
     lookup_field = 'slug'
 
 
-class ProductListView(generics.ListCreateAPIView):
+class ProductListView(EagerLoadingViewMixin, CachedResponseMixin, FacetCountsMixin, generics.ListCreateAPIView):
     queryset = Product.objects.filter(is_active=True)
+    cache_namespaces = ('categories', 'products')
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ProductCursorPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductDistanceFilter, ProductOrderingFilter]
     filterset_fields = ['category', 'city', 'is_featured']
     search_fields = ['name', 'description', 'city']
     ordering_fields = ['daily_price', 'created_at', 'view_count']
@@ -40,23 +66,35 @@ class ProductListView(generics.ListCreateAPIView):
         return ProductDetailSerializer
 
 
-class ProductDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ProductDetailView(EagerLoadingViewMixin, CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Product.objects.all()
     serializer_class = ProductDetailSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
     
-    def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        instance.view_count += 1
-        instance.save(update_fields=['view_count'])
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+    def get_cache_namespaces(self):
+        return ('categories', f"product:{self.kwargs['slug']}")
+    
+    def get(self, request, *args, **kwargs):
+        response = super().get(request, *args, **kwargs)
+        # Views are buffered and written back in batches, cached or not
+        if response.status_code == 200:
+            get_view_count_buffer().increment(response.data['id'])
+        return response
 
 
-class ProductsByCategoryView(generics.ListAPIView):
+class ProductsByCategoryView(EagerLoadingViewMixin, CachedResponseMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = ProductCursorPagination
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, ProductDistanceFilter, ProductOrderingFilter]
+    filterset_fields = ['city', 'is_featured']
+    search_fields = ['name', 'description', 'city']
+    ordering_fields = ['daily_price', 'created_at', 'view_count']
+    ordering = ['-created_at']
+    
+    def get_cache_namespaces(self):
+        return ('categories', f"category:{self.kwargs['category_slug']}")
     
     def get_queryset(self):
         category_slug = self.kwargs['category_slug']
@@ -74,27 +112,44 @@ def vendor_dashboard_stats(request):
     if request.user.role != 'vendor':
         return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    from subscriptions.models import Subscription
-    from payments.models import Payment
+    from payments.rollups import totals
     
-    products = Product.objects.filter(vendor=request.user)
-    subscriptions = Subscription.objects.filter(product__in=products)
+    # Earnings and rental counts come from the vendor's daily rollup rows
+    stats = totals(request.user)
+    
+    return Response({
+        'active_rentals': stats['active_rentals'],
+        'total_products': Product.objects.filter(vendor=request.user).count(),
+        'total_earnings': float(stats['earnings']),
+        'pending_rentals': stats['pending_rentals'],
+        'completed_rentals': stats['completed_rentals']
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def vendor_earnings(request):
+    """Vendor earnings and new rentals per day, week or month"""
+    if request.user.role != 'vendor':
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
-    active_rentals = subscriptions.filter(status='active').count()
-    total_products = products.count()
+    from payments.rollups import earnings_series
     
-    payments = Payment.objects.filter(
-        subscription__in=subscriptions,
-        status='success'
-    )
-    total_earnings = sum(float(p.amount) for p in payments)
+    interval = request.query_params.get('interval', 'day')
+    try:
+        days = int(request.query_params.get('days', 30))
+    except ValueError:
+        return Response({'error': 'days must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+    if interval not in ('day', 'week', 'month') or not 1 <= days <= 366:
+        return Response(
+            {'error': 'interval must be day, week or month and days between 1 and 366'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
     
     return Response({
-        'active_rentals': active_rentals,
-        'total_products': total_products,
-        'total_earnings': total_earnings,
-        'pending_rentals': subscriptions.filter(status='pending').count(),
-        'completed_rentals': subscriptions.filter(status='completed').count()
+        'interval': interval,
+        'days': days,
+        'series': earnings_series(request.user, days, interval)
     })
 
 
@@ -123,10 +178,20 @@ def vendor_rentals(request):
     products = Product.objects.filter(vendor=request.user)
     subscriptions = Subscription.objects.filter(product__in=products)
     
-    serializer = SubscriptionSerializer(subscriptions, many=True)
+    serializer = SubscriptionSerializer(subscriptions, many=True, context={'request': request})
     return Response(serializer.data)
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def admin_catalog_cache_stats(request):
+    """Admin: Catalog response cache hit/miss counters"""
+    if not (request.user.is_superuser or request.user.role == 'admin'):
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response(get_stats())
+
+
 # ADMIN CRUD OPERATIONS
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
@@ -245,6 +310,23 @@ def admin_rental_action(request, rental_id):
         return Response(serializer.data)
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def admin_bulk_rental_status(request):
+    """Admin: Move many rentals to one status"""
+    if not (request.user.is_superuser or request.user.role == 'admin'):
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    from subscriptions.serializers import BulkStatusSerializer
+    from subscriptions.transitions import bulk_transition
+    
+    serializer = BulkStatusSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = bulk_transition(serializer.validated_data['ids'], serializer.validated_data['status'])
+    return Response({'status': serializer.validated_data['status'], **result})
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
@@ -261,6 +343,33 @@ def vendor_create_product(request):
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FormParser, JSONParser])
+def vendor_import_products(request):
+    """Vendor: Create products in bulk from an uploaded CSV/JSON file or a JSON list"""
+    if request.user.role != 'vendor':
+        return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
+    
+    upload = request.FILES.get('file')
+    if upload is not None:
+        import_format = request.data.get('format') or get_import_format(upload.name, upload.content_type)
+        if import_format not in ('csv', 'json'):
+            return Response({'error': 'Upload a .csv or .json file'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            rows = read_rows(upload, import_format)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        rows = request.data.get('products') if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list):
+            return Response({'error': 'Send a file or a JSON list of products'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = import_products(rows, request.user)
+    response_status = status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST
+    return Response(result, status=response_status)
+
+
 @api_view(['PATCH', 'DELETE'])
 @permission_classes([IsAuthenticated])
 @parser_classes([MultiPartParser, FormParser])
@@ -0,0 +1,13 @@
+"""
+Celery application for rentkart_backend project.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'rentkart_backend.settings')
+
+app = Celery('rentkart_backend')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
@@ -0,0 +1,70 @@
+"""
+Shared pieces of the delta-maintained rollups (vendor stats, revenue
+buckets, analytics cube).
+
+increment() adds deltas to a counter row with an insert-or-ignore and one
+`F()` UPDATE, so concurrent writers never overwrite each other.
+
+The rollups keep themselves in step with Subscription and Payment through
+save signals, and each needs the row's values before and after the save,
+some of them across relations. Each rollup declares the values it reads with
+track(). One pre_save query then loads the previous values for all of them,
+and the saved values are loaded at most once, by the first post_save
+receiver that asks for them.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import pre_save
+
+
+def increment(model, key, **deltas):
+    """Add `deltas` to the `model` row matching `key`, creating it if needed"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    # No savepoint: inside a save's transaction a failure here rolls the save back too
+    with transaction.atomic(savepoint=False):
+        # Only additions create a row; a removal always follows its addition,
+        # and must not resurrect rows a cascading delete has removed
+        if any(delta > 0 for delta in deltas.values()):
+            model.objects.bulk_create([model(**key)], ignore_conflicts=True)
+        model.objects.filter(**key).update(**{field: F(field) + delta for field, delta in deltas.items()})
+
+
+_tracked = defaultdict(list)
+
+
+def track(model, *fields):
+    """Have previous() and current() include `fields` (values() lookups) of `model`"""
+    if model not in _tracked:
+        pre_save.connect(_remember_previous, sender=model, dispatch_uid=f'counters:{model._meta.label}')
+    _tracked[model].extend(field for field in fields if field not in _tracked[model])
+
+
+def _load(instance):
+    model = type(instance)
+    return model._default_manager.filter(pk=instance.pk).values(*_tracked[model]).first()
+
+
+def _remember_previous(sender, instance, **kwargs):
+    instance.__dict__.pop('_current_values', None)
+    if instance._state.adding and instance._meta.pk.has_default():
+        # A new row with a generated key is inserted without looking for an old one
+        instance._previous_values = None
+    else:
+        instance._previous_values = _load(instance)
+
+
+def previous(instance):
+    """The tracked values of the row before this save, or None for a new row"""
+    return instance._previous_values
+
+
+def current(instance):
+    """The tracked values of the row as just saved"""
+    if '_current_values' not in instance.__dict__:
+        instance._current_values = _load(instance)
+    return instance._current_values
@@ -0,0 +1,89 @@
+from django.db.models import QuerySet
+from rest_framework import serializers
+
+
+def setup_queryset(serializer, queryset):
+    """
+    Apply a serializer instance's query plan: its sparse-fieldset projection
+    when it takes `?fields=` / `?expand=`, otherwise its eager loading
+    """
+    if getattr(serializer, 'sparse_params', False):
+        return serializer.setup_queryset(queryset)
+    if isinstance(serializer, EagerLoadingMixin):
+        return serializer.setup_eager_loading(queryset)
+    return queryset
+
+
+class EagerLoadingListSerializer(serializers.ListSerializer):
+    """List serializer that joins the child's relations before iterating a queryset"""
+
+    def to_representation(self, data):
+        if isinstance(data, QuerySet) and data._result_cache is None:
+            data = setup_queryset(self.child, data)
+        return super().to_representation(data)
+
+
+class EagerLoadingMixin:
+    """
+    Serializer mixin that declares the relations its fields read.
+
+    `select_related_fields` and `prefetch_related_fields` list the lookups the
+    serializer itself needs. Relations read by nested serializers that use this
+    mixin are picked up automatically and prefixed with the nested `source`.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = EagerLoadingListSerializer
+        return super().many_init(*args, **kwargs)
+
+    @classmethod
+    def get_eager_relations(cls, prefix=''):
+        """Return the (select_related, prefetch_related) lookups for this serializer"""
+        select = [prefix + name for name in cls.select_related_fields]
+        prefetch = [prefix + name for name in cls.prefetch_related_fields]
+
+        for field_name, field in cls._declared_fields.items():
+            many = isinstance(field, serializers.ListSerializer)
+            nested = field.child if many else field
+            if not isinstance(nested, EagerLoadingMixin):
+                continue
+            source = field.source or field_name
+            if source == '*':
+                continue
+            nested_select, nested_prefetch = type(nested).get_eager_relations(f'{prefix}{source}__')
+            if many:
+                prefetch.append(prefix + source)
+                prefetch.extend(nested_select + nested_prefetch)
+            else:
+                select.append(prefix + source)
+                select.extend(nested_select)
+                prefetch.extend(nested_prefetch)
+
+        return select, prefetch
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        select, prefetch = cls.get_eager_relations()
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
+
+class EagerLoadingViewMixin:
+    """Generic view mixin that applies the serializer's eager loading to list and detail lookups"""
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        if getattr(serializer_class, 'sparse_params', False):
+            return setup_queryset(self.get_serializer(), queryset)
+        if issubclass(serializer_class, EagerLoadingMixin):
+            queryset = serializer_class.setup_eager_loading(queryset)
+        return queryset
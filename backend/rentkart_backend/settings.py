@@ -52,6 +52,7 @@ INSTALLED_APPS = [
     'subscriptions',
     'payments',
     'notifications',
+    'analytics',
 ]
 
 MIDDLEWARE = [
@@ -162,7 +163,15 @@ cloudinary.config(
 DEFAULT_FILE_STORAGE = 'cloudinary_storage.storage.MediaCloudinaryStorage'
 
 # Media URL
-# MEDIA_URL = '/media/'
+MEDIA_URL = '/media/'
+MEDIA_ROOT = BASE_DIR / 'media'
+
+# Where product and category images and their variants are stored: 'cloudinary',
+# or 'local' (files under MEDIA_ROOT) for development and tests
+IMAGE_STORE = os.environ.get(
+    'IMAGE_STORE',
+    'cloudinary' if os.environ.get('CLOUDINARY_CLOUD_NAME') else 'local'
+)
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -226,6 +235,98 @@ if not DEBUG:
     SECURE_HSTS_PRELOAD = True
 
 
+# Redis (optional) - shared by Celery and the buffered counters
+REDIS_URL = os.environ.get('REDIS_URL')
+
+# Cache - local memory by default, Redis when REDIS_URL is set
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'rentkart',
+        }
+    }
+
+# Anonymous catalog responses (see products.response_cache)
+CATALOG_CACHE_ENABLED = os.environ.get('CATALOG_CACHE_ENABLED', 'True') == 'True'
+CATALOG_CACHE_ALIAS = os.environ.get('CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TIMEOUT = int(os.environ.get('CATALOG_CACHE_TIMEOUT', 300))
+
+# Product view counts are buffered ('redis' or 'local') and written back in batches;
+# the local buffer is per process, not flushed by beat and lost on a kill, so
+# outside DEBUG it raises the products.W001 warning
+VIEW_COUNT_BUFFER = os.environ.get('VIEW_COUNT_BUFFER', 'redis' if REDIS_URL else 'local')
+VIEW_COUNT_FLUSH_SECONDS = int(os.environ.get('VIEW_COUNT_FLUSH_SECONDS', 60))
+
+# Homepage counters (users.public_stats) are never older than PUBLIC_STATS_MAX_AGE
+# seconds and are recounted in the background every PUBLIC_STATS_REFRESH_SECONDS
+PUBLIC_STATS_MAX_AGE = int(os.environ.get('PUBLIC_STATS_MAX_AGE', 300))
+PUBLIC_STATS_REFRESH_SECONDS = int(os.environ.get(
+    'PUBLIC_STATS_REFRESH_SECONDS', max(PUBLIC_STATS_MAX_AGE // 2, 1)
+))
+
+# Invoice numbers reserved per worker process at a time (see payments.invoice_numbers);
+# 1 keeps the numbering gapless
+INVOICE_NUMBER_BLOCK_SIZE = int(os.environ.get('INVOICE_NUMBER_BLOCK_SIZE', 1))
+
+# Rendered invoice PDFs, stored by content hash (see payments.invoice_pdf)
+INVOICE_PDF_ROOT = os.environ.get('INVOICE_PDF_ROOT', str(BASE_DIR / 'invoice_pdfs'))
+
+# Worker processes rendering PDFs for batch invoice exports (payments.invoice_export)
+INVOICE_EXPORT_WORKERS = int(os.environ.get('INVOICE_EXPORT_WORKERS', os.cpu_count() or 1))
+
+# Pending payments older than this that a settlement file doesn't list are failed
+# by payment reconciliation (payments.reconciliation)
+PAYMENT_RECONCILE_GRACE_HOURS = int(os.environ.get('PAYMENT_RECONCILE_GRACE_HOURS', 24))
+
+# Active subscriptions past their end date are completed every
+# SUBSCRIPTION_SWEEP_SECONDS, SUBSCRIPTION_SWEEP_BATCH_SIZE per transaction
+SUBSCRIPTION_SWEEP_SECONDS = int(os.environ.get('SUBSCRIPTION_SWEEP_SECONDS', 3600))
+SUBSCRIPTION_SWEEP_BATCH_SIZE = int(os.environ.get('SUBSCRIPTION_SWEEP_BATCH_SIZE', 500))
+
+# Celery Configuration
+CELERY_BROKER_URL = os.environ.get('CELERY_BROKER_URL', REDIS_URL or 'memory://')
+# Without a real broker, run tasks inline in the calling process
+CELERY_TASK_ALWAYS_EAGER = os.environ.get(
+    'CELERY_TASK_ALWAYS_EAGER',
+    str(CELERY_BROKER_URL == 'memory://')
+) == 'True'
+CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'flush-product-view-counts': {
+        'task': 'products.tasks.flush_view_counts',
+        'schedule': VIEW_COUNT_FLUSH_SECONDS,
+    },
+    'refresh-public-stats': {
+        'task': 'users.tasks.refresh_public_stats',
+        'schedule': PUBLIC_STATS_REFRESH_SECONDS,
+    },
+    'complete-expired-subscriptions': {
+        'task': 'subscriptions.tasks.complete_expired_subscriptions',
+        'schedule': SUBSCRIPTION_SWEEP_SECONDS,
+    },
+}
+
+# Payment gateway used by the payment pipeline (payments.gateways); the simulated
+# one waits PAYMENT_GATEWAY_LATENCY seconds per call, which with the in-memory
+# broker would be spent inside the checkout request, so it defaults to 0 there
+PAYMENT_GATEWAY = os.environ.get('PAYMENT_GATEWAY', 'payments.gateways.SimulatedGateway')
+PAYMENT_GATEWAY_LATENCY = float(os.environ.get(
+    'PAYMENT_GATEWAY_LATENCY', 0 if CELERY_BROKER_URL == 'memory://' else 0.5
+))
+PAYMENT_GATEWAY_SUCCESS_RATE = float(os.environ.get('PAYMENT_GATEWAY_SUCCESS_RATE', 0.8))
+
+
 # Swagger Settings
 SWAGGER_SETTINGS = {
     'SECURITY_DEFINITIONS': {
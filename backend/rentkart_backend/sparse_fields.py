@@ -0,0 +1,215 @@
+"""
+Sparse fieldsets for nested serializers.
+
+`?fields=id,status,product_details.name` keeps only the listed fields; a
+dotted name selects fields of a nested serializer. `?expand=` lists the nested
+serializers to embed (`?expand=subscription_details.product_details`); the
+ones left out are dropped, leaving the plain foreign key field for the id.
+Without either parameter a serializer renders as before.
+
+`setup_queryset()` then plans the query from the fields that survived: it
+joins and prefetches only the relations they read and defers every column
+they don't, using `field_dependencies` for properties and method fields.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+from .eager_loading import EagerLoadingMixin
+
+
+ALL = None
+
+
+def parse_field_tree(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+def _nested(field):
+    """The nested serializer behind `field`, and whether it is a list"""
+    if isinstance(field, serializers.ListSerializer):
+        return field.child, True
+    if isinstance(field, serializers.BaseSerializer):
+        return field, False
+    return None, False
+
+
+class QueryPlan:
+    """Columns to load per relation path, plus the joins and prefetches to make"""
+
+    def __init__(self, model):
+        self.models = {'': model}
+        # Keyset pagination reads the default ordering fields off each page
+        ordering = {name.lstrip('-') for name in model._meta.ordering if isinstance(name, str)}
+        self.columns = {'': {model._meta.pk.name} | {name for name in ordering if '__' not in name and name != '?'}}
+        self.select = []
+        self.prefetch = []
+
+    def add_column(self, prefix, name):
+        if self.columns.get(prefix, set()) is not ALL:
+            self.columns.setdefault(prefix, set()).add(name)
+
+    def load_all(self, prefix):
+        self.columns[prefix] = ALL
+
+    def join(self, model, prefix, name):
+        """select_related `name` from the model at `prefix`; returns the new prefix"""
+        field = model._meta.get_field(name)
+        self.add_column(prefix, name)
+        path = f'{prefix}{name}'
+        if path not in self.select:
+            self.select.append(path)
+        related = field.related_model
+        nested = f'{path}__'
+        self.models[nested] = related
+        self.columns.setdefault(nested, {related._meta.pk.name})
+        return related, nested
+
+    def join_all(self, lookup):
+        """select_related a `__` lookup from the root and load every column along it"""
+        model, prefix = self.models[''], ''
+        for name in lookup.split('__'):
+            model, prefix = self.join(model, prefix, name)
+            self.load_all(prefix)
+
+    def add_path(self, model, prefix, names):
+        """Load the attribute reached through `names`, following forward relations"""
+        for index, name in enumerate(names):
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                # A property or method: its inputs are unknown
+                self.load_all(prefix)
+                return
+            if not field.concrete:
+                path = f'{prefix}{name}'
+                if path not in self.prefetch:
+                    self.prefetch.append(path)
+                return
+            if not field.is_relation or index == len(names) - 1:
+                self.add_column(prefix, name)
+                return
+            model, prefix = self.join(model, prefix, name)
+
+    def only(self):
+        fields = []
+        for prefix, columns in self.columns.items():
+            if columns is ALL:
+                columns = [field.name for field in self.models[prefix]._meta.concrete_fields]
+            fields.extend(f'{prefix}{column}' for column in sorted(columns))
+        return fields
+
+
+class SparseFieldsMixin(EagerLoadingMixin):
+    """
+    Serializer mixin for `?fields=` / `?expand=`.
+
+    Serializers with `sparse_params = True` read the parameters from the
+    request on GET; nested serializers are configured by their parent, or
+    with the `fields=` / `expand=` keyword arguments (comma-separated strings).
+    """
+    sparse_params = False
+    field_dependencies = {}
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        request = self._context.get('request')
+        if self.sparse_params and request is not None and request.method == 'GET':
+            fields = request.query_params.get('fields', fields)
+            expand = request.query_params.get('expand', expand)
+        self.configure_sparse(
+            parse_field_tree(fields) if fields is not None else None,
+            parse_field_tree(expand) if expand is not None else None,
+        )
+
+    def configure_sparse(self, fields=None, expand=None):
+        """`fields` / `expand` are parsed trees; None leaves that side unrestricted"""
+        self._sparse_fields = fields or None
+        self._sparse_expand = expand
+        self.__dict__.pop('fields', None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = getattr(self, '_sparse_fields', None)
+        expand = getattr(self, '_sparse_expand', None)
+
+        if selected is not None:
+            fields = {name: field for name, field in fields.items() if name in selected}
+
+        for name in list(fields):
+            nested, _ = _nested(fields[name])
+            if nested is None:
+                continue
+            if expand is not None and name not in expand:
+                del fields[name]
+                continue
+            if isinstance(nested, SparseFieldsMixin):
+                nested.configure_sparse(
+                    selected.get(name) if selected is not None else None,
+                    expand.get(name, {}) if expand is not None else None,
+                )
+        return fields
+
+    def plan_query(self, model, plan=None, prefix=''):
+        """Add the columns and relations this serializer's fields read to `plan`"""
+        plan = plan or QueryPlan(model)
+        for name, field in self.fields.items():
+            if name in self.field_dependencies:
+                for dependency in self.field_dependencies[name]:
+                    plan.add_path(model, prefix, dependency.split('__'))
+                continue
+
+            if field.source == '*':
+                plan.load_all(prefix)
+                continue
+
+            nested, many = _nested(field)
+            if nested is None:
+                plan.add_path(model, prefix, field.source_attrs)
+                continue
+
+            try:
+                relation = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                plan.load_all(prefix)
+                continue
+            if many or not relation.concrete:
+                # Prefetched with the related model's default columns
+                path = f'{prefix}{field.source}'
+                if path not in plan.prefetch:
+                    plan.prefetch.append(path)
+                if isinstance(nested, EagerLoadingMixin):
+                    select, prefetch = type(nested).get_eager_relations(f'{path}__')
+                    plan.prefetch.extend(lookup for lookup in select + prefetch if lookup not in plan.prefetch)
+                continue
+
+            related, nested_prefix = plan.join(model, prefix, field.source)
+            if isinstance(nested, SparseFieldsMixin):
+                nested.plan_query(related, plan, nested_prefix)
+                continue
+            plan.load_all(nested_prefix)
+            if isinstance(nested, EagerLoadingMixin):
+                select, prefetch = type(nested).get_eager_relations(nested_prefix)
+                for lookup in select:
+                    plan.join_all(lookup)
+                plan.prefetch.extend(lookup for lookup in prefetch if lookup not in plan.prefetch)
+        return plan
+
+    def setup_queryset(self, queryset):
+        """Join, prefetch and load only what the selected fields read"""
+        plan = self.plan_query(queryset.model)
+        if plan.select:
+            queryset = queryset.select_related(*plan.select)
+        if plan.prefetch:
+            queryset = queryset.prefetch_related(*plan.prefetch)
+        return queryset.only(*plan.only())
@@ -2,4 +2,7 @@ from django.apps import AppConfig
 
 class SubscriptionsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'subscriptions'
\ No newline at end of file
+    name = 'subscriptions'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,126 @@
+"""
+Date-range availability for rentable products.
+
+ProductOccupancy holds, per product and per day, how many units are held by
+pending or active subscriptions. A rental occupies the half-open range
+[start_date, end_date): the item comes back on end_date and can go out again
+the same day. A product is free for a range when no day in it has all of the
+product's `quantity` units booked.
+"""
+
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef
+
+from .models import ProductOccupancy, Subscription
+
+
+OCCUPYING_STATUSES = ('pending', 'active')
+
+
+def _days(start, end):
+    return [start + timedelta(days=offset) for offset in range((end - start).days)]
+
+
+def occupy(product_id, start, end, units=1):
+    """Add `units` (negative to release) to every day in [start, end)"""
+    days = _days(start, end)
+    if not days or not units:
+        return
+    with transaction.atomic():
+        if units > 0:
+            ProductOccupancy.objects.bulk_create(
+                [ProductOccupancy(product_id=product_id, day=day) for day in days],
+                ignore_conflicts=True,
+            )
+        booked_days = ProductOccupancy.objects.filter(product_id=product_id, day__gte=start, day__lt=end)
+        booked_days.update(booked=F('booked') + units)
+        if units < 0:
+            booked_days.filter(booked__lte=0).delete()
+
+
+def release(product_id, start, end, units=1):
+    occupy(product_id, start, end, -units)
+
+
+def occupy_many(bookings, units=1):
+    """occupy() for many (product, start, end) bookings, with one UPDATE per product and delta"""
+    booked = defaultdict(Counter)
+    for product_id, start, end in bookings:
+        for day in _days(start, end):
+            booked[product_id][day] += units
+    if not booked or not units:
+        return
+    with transaction.atomic():
+        if units > 0:
+            ProductOccupancy.objects.bulk_create(
+                [ProductOccupancy(product_id=product_id, day=day)
+                 for product_id, days in booked.items() for day in days],
+                ignore_conflicts=True,
+                batch_size=1000,
+            )
+        for product_id, days in booked.items():
+            days_by_delta = defaultdict(list)
+            for day, delta in days.items():
+                days_by_delta[delta].append(day)
+            for delta, group in days_by_delta.items():
+                ProductOccupancy.objects.filter(product_id=product_id, day__in=group).update(
+                    booked=F('booked') + delta
+                )
+        if units < 0:
+            ProductOccupancy.objects.filter(product_id__in=list(booked), booked__lte=0).delete()
+
+
+def release_many(bookings, units=1):
+    occupy_many(bookings, -units)
+
+
+def _fully_booked(start, end, units):
+    return ProductOccupancy.objects.filter(
+        product=OuterRef('pk'),
+        day__gte=start,
+        day__lt=end,
+        booked__gt=OuterRef('quantity') - units,
+    )
+
+
+def is_available(product, start, end, units=1):
+    """True when `units` of `product` are free on every day in [start, end)"""
+    if units > product.quantity:
+        return False
+    return not ProductOccupancy.objects.filter(
+        product=product,
+        day__gte=start,
+        day__lt=end,
+        booked__gt=product.quantity - units,
+    ).exists()
+
+
+def available_products(queryset, start, end, units=1):
+    """Narrow a Product queryset to the products free for [start, end), in one query"""
+    return queryset.filter(quantity__gte=units).exclude(Exists(_fully_booked(start, end, units)))
+
+
+def rebuild_occupancy(product_ids=None):
+    """Recompute the index from the occupying subscriptions"""
+    subscriptions = Subscription.objects.filter(status__in=OCCUPYING_STATUSES)
+    occupancy = ProductOccupancy.objects.all()
+    if product_ids is not None:
+        subscriptions = subscriptions.filter(product_id__in=product_ids)
+        occupancy = occupancy.filter(product_id__in=product_ids)
+
+    booked = Counter()
+    for product_id, start, end in subscriptions.values_list('product_id', 'start_date', 'end_date').iterator():
+        for day in _days(start, end):
+            booked[product_id, day] += 1
+
+    with transaction.atomic():
+        occupancy.delete()
+        ProductOccupancy.objects.bulk_create(
+            [ProductOccupancy(product_id=product_id, day=day, booked=units)
+             for (product_id, day), units in booked.items()],
+            batch_size=1000,
+        )
+    return len(booked)
@@ -0,0 +1,48 @@
+"""
+Subscription lifecycle sweeper.
+
+An active rental whose end_date has come is completed by
+complete_expired(), which runs periodically from Celery beat and on demand
+from the `complete_expired_subscriptions` command. It works in batches: each
+locks up to `batch_size` expired rentals, found through the (status,
+end_date) index, and completes them with one UPDATE. The batch is then
+announced with `statuses_changed`, the same way as a bulk status change, so
+the availability index gives the units back and the vendor rollups and
+analytics cube move the rentals in bulk. Once the batch commits,
+`subscriptions_completed` is sent with its ids for anything that tells
+customers or vendors.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Subscription
+from .signals import statuses_changed, subscriptions_completed
+
+
+def expired(today=None):
+    """Active subscriptions whose end_date is today or earlier"""
+    today = today or timezone.localdate()
+    return Subscription.objects.filter(status='active', end_date__lte=today)
+
+
+def complete_expired(today=None, batch_size=None):
+    """Complete every expired active subscription; returns how many were completed"""
+    batch_size = batch_size or settings.SUBSCRIPTION_SWEEP_BATCH_SIZE
+    today = today or timezone.localdate()
+    completed = 0
+    while True:
+        with transaction.atomic():
+            ids = list(
+                expired(today).select_for_update().order_by('end_date', 'pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            Subscription.objects.filter(pk__in=ids, status='active').update(
+                status='completed', updated_at=timezone.now()
+            )
+            statuses_changed.send(sender=Subscription, ids=ids, previous='active', status='completed')
+            transaction.on_commit(lambda ids=ids: subscriptions_completed.send(sender=Subscription, ids=ids))
+        completed += len(ids)
+    return completed
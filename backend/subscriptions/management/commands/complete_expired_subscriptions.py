@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from subscriptions.lifecycle import complete_expired, expired
+
+
+class Command(BaseCommand):
+    help = 'Complete active subscriptions whose end date has passed and release their availability'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Defaults to SUBSCRIPTION_SWEEP_BATCH_SIZE')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the expired subscriptions')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'{expired().count()} expired active subscriptions')
+            return
+        completed = complete_expired(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Completed {completed} expired subscriptions'))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from subscriptions.availability import rebuild_occupancy
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-day product availability index from subscriptions'
+
+    def handle(self, *args, **options):
+        days = rebuild_occupancy()
+        self.stdout.write(self.style.SUCCESS(f'Availability index rebuilt ({days} booked product-days)'))
@@ -0,0 +1,72 @@
+# Generated by Django 5.2.12 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from collections import Counter
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_occupancy(apps, schema_editor):
+    Subscription = apps.get_model("subscriptions", "Subscription")
+    ProductOccupancy = apps.get_model("subscriptions", "ProductOccupancy")
+
+    booked = Counter()
+    bookings = Subscription.objects.filter(status__in=["pending", "active"]).values_list(
+        "product_id", "start_date", "end_date"
+    )
+    for product_id, start, end in bookings:
+        for offset in range((end - start).days):
+            booked[product_id, start + timedelta(days=offset)] += 1
+
+    ProductOccupancy.objects.bulk_create(
+        [
+            ProductOccupancy(product_id=product_id, day=day, booked=units)
+            for (product_id, day), units in booked.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("products", "0006_product_search_index"),
+        ("subscriptions", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductOccupancy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField()),
+                ("booked", models.PositiveIntegerField(default=0)),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="occupancy",
+                        to="products.product",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "Product occupancy",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("product", "day"), name="unique_product_day_occupancy"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_occupancy, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.12 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("customers", "0002_initial"),
+        ("products", "0008_image_variants"),
+        ("subscriptions", "0002_product_occupancy"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="subscription",
+            index=models.Index(
+                fields=["status", "end_date"], name="subscription_status_end_idx"
+            ),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from users.models import User
 from products.models import Product
@@ -47,6 +47,10 @@ class Subscription(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Expired active rentals, for the lifecycle sweeper
+            models.Index(fields=['status', 'end_date'], name='subscription_status_end_idx'),
+        ]
     
     def __str__(self):
         return f"{self.customer.user.email} - {self.product.name}"
@@ -89,4 +93,23 @@ class Subscription(models.Model):
             self.calculate_end_date()
         if not self.total_amount:
             self.calculate_total_amount()
-        super().save(*args, **kwargs)
+        # The signal receivers' rollup deltas commit or roll back with the row
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ProductOccupancy(models.Model):
+    """Units of a product booked on one day - the per-day availability index"""
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='occupancy')
+    day = models.DateField()
+    booked = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        verbose_name_plural = 'Product occupancy'
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='unique_product_day_occupancy'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} @ {self.day}: {self.booked}"
@@ -1,9 +1,18 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Subscription
+from .availability import is_available
 from products.serializers import ProductListSerializer
+from rentkart_backend.sparse_fields import SparseFieldsMixin
 
 
-class SubscriptionSerializer(serializers.ModelSerializer):
+class SubscriptionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    sparse_params = True
+    field_dependencies = {
+        'days_remaining': ('status', 'end_date'),
+        'is_active': ('status', 'end_date'),
+    }
+
     product_details = ProductListSerializer(source='product', read_only=True)
     days_remaining = serializers.IntegerField(read_only=True)
     is_active = serializers.BooleanField(read_only=True)
@@ -29,3 +38,37 @@ class CreateSubscriptionSerializer(serializers.ModelSerializer):
         if value < timezone.now().date():
             raise serializers.ValidationError("Start date cannot be in the past")
         return value
+    
+    def create(self, validated_data):
+        from products.models import Product
+        
+        with transaction.atomic():
+            # Lock the product so concurrent bookings are checked one at a time
+            product = Product.objects.select_for_update().get(pk=validated_data['product'].pk)
+            subscription = Subscription(**validated_data)
+            subscription.calculate_end_date()
+            if not product.is_active or not is_available(product, subscription.start_date, subscription.end_date):
+                raise serializers.ValidationError({
+                    'product': 'This product is not available for the selected dates'
+                })
+            subscription.save()
+        return subscription
+
+
+class BulkStatusSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.UUIDField(), allow_empty=False, max_length=1000)
+    status = serializers.ChoiceField(choices=Subscription.STATUS_CHOICES)
+
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+    category = serializers.SlugField(required=False)
+    
+    def validate(self, data):
+        if data['end_date'] <= data['start_date']:
+            raise serializers.ValidationError("End date must be after start date")
+        if (data['end_date'] - data['start_date']).days > 366:
+            raise serializers.ValidationError("Date range cannot exceed one year")
+        return data
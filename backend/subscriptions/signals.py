@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from rentkart_backend import counters
+
+from .availability import OCCUPYING_STATUSES, occupy, occupy_many, release
+from .models import Subscription
+
+
+# Sent by bulk status changes (subscriptions.transitions), whose queryset
+# UPDATE skips post_save: the subscriptions in `ids` moved from `previous`
+# to `status`
+statuses_changed = Signal()
+
+# Sent once expired rentals completed by subscriptions.lifecycle are committed,
+# with their `ids`
+subscriptions_completed = Signal()
+
+
+def _booking(product_id, start_date, end_date, status):
+    """The (product, start, end) a subscription holds, or None if it holds nothing"""
+    if status in OCCUPYING_STATUSES and start_date and end_date:
+        return (product_id, start_date, end_date)
+    return None
+
+
+BOOKING_FIELDS = ('product_id', 'start_date', 'end_date', 'status')
+counters.track(Subscription, *BOOKING_FIELDS)
+
+
+@receiver(post_save, sender=Subscription)
+def update_occupancy(sender, instance, **kwargs):
+    """Move the subscription's hold on the availability index"""
+    current = _booking(instance.product_id, instance.start_date, instance.end_date, instance.status)
+    values = counters.previous(instance)
+    previous = _booking(*(values[field] for field in BOOKING_FIELDS)) if values else None
+    if current == previous:
+        return
+    if previous:
+        release(*previous)
+    if current:
+        occupy(*current)
+
+
+@receiver(post_delete, sender=Subscription)
+def release_occupancy(sender, instance, **kwargs):
+    booking = _booking(instance.product_id, instance.start_date, instance.end_date, instance.status)
+    if booking:
+        release(*booking)
+
+
+@receiver(statuses_changed, sender=Subscription)
+def move_occupancy(sender, ids, previous, status, **kwargs):
+    held, holds = previous in OCCUPYING_STATUSES, status in OCCUPYING_STATUSES
+    if held == holds:
+        return
+    bookings = Subscription.objects.filter(pk__in=ids).values_list('product_id', 'start_date', 'end_date')
+    occupy_many(bookings, 1 if holds else -1)
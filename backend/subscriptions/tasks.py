@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .lifecycle import complete_expired
+
+
+@shared_task
+def complete_expired_subscriptions():
+    """Complete the active rentals whose end date has passed"""
+    return complete_expired()
@@ -0,0 +1,60 @@
+"""
+Bulk rental status changes.
+
+The requested subscriptions are locked and checked against TRANSITIONS, then
+moved with one UPDATE per current status. A queryset UPDATE skips post_save,
+so each group is announced with `statuses_changed`, whose receivers apply it
+to the availability index, the vendor rollups and the analytics cube in
+batch rather than per rental.
+"""
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Subscription
+from .signals import statuses_changed
+
+
+# Allowed moves from each status; completed and cancelled rentals are final
+TRANSITIONS = {
+    'pending': {'active', 'cancelled'},
+    'active': {'completed', 'cancelled'},
+    'completed': set(),
+    'cancelled': set(),
+}
+
+
+def bulk_transition(ids, status):
+    """
+    Move the subscriptions in `ids` to `status`. Returns the ids updated, the
+    ids already in `status`, and an error per id that was missing or could
+    not make the move.
+    """
+    ids = list(dict.fromkeys(ids))
+    updated, unchanged, errors = [], [], []
+
+    with transaction.atomic():
+        current = dict(
+            Subscription.objects.select_for_update().filter(pk__in=ids).values_list('pk', 'status')
+        )
+        groups = defaultdict(list)
+        for pk in ids:
+            previous = current.get(pk)
+            if previous is None:
+                errors.append({'id': pk, 'error': 'Rental not found'})
+            elif previous == status:
+                unchanged.append(pk)
+            elif status not in TRANSITIONS.get(previous, ()):
+                errors.append({'id': pk, 'error': f'Cannot change a {previous} rental to {status}'})
+            else:
+                groups[previous].append(pk)
+
+        now = timezone.now()
+        for previous, group in groups.items():
+            Subscription.objects.filter(pk__in=group, status=previous).update(status=status, updated_at=now)
+            statuses_changed.send(sender=Subscription, ids=group, previous=previous, status=status)
+            updated.extend(group)
+
+    return {'updated': updated, 'unchanged': unchanged, 'errors': errors}
@@ -5,4 +5,6 @@ urlpatterns = [
     path('', views.SubscriptionListView.as_view(), name='subscription-list'),
     path('create/', views.CreateSubscriptionView.as_view(), name='subscription-create'),
     path('<uuid:pk>/', views.SubscriptionDetailView.as_view(), name='subscription-detail'),
+    path('availability/', views.available_product_list, name='available-products'),
+    path('availability/<uuid:product_id>/', views.product_availability, name='product-availability'),
 ]
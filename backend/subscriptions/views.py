@@ -1,12 +1,16 @@
 from rest_framework import generics, status
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from .models import Subscription
-from .serializers import SubscriptionSerializer, CreateSubscriptionSerializer
+from .serializers import SubscriptionSerializer, CreateSubscriptionSerializer, AvailabilityQuerySerializer
+from .availability import is_available, available_products
+from products.models import Product
 from customers.models import Customer
+from rentkart_backend.eager_loading import EagerLoadingViewMixin
 
 
-class SubscriptionListView(generics.ListAPIView):
+class SubscriptionListView(EagerLoadingViewMixin, generics.ListAPIView):
     """List user's subscriptions"""
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated]
@@ -38,7 +42,7 @@ class CreateSubscriptionView(generics.CreateAPIView):
         }, status=status.HTTP_201_CREATED)
 
 
-class SubscriptionDetailView(generics.RetrieveAPIView):
+class SubscriptionDetailView(EagerLoadingViewMixin, generics.RetrieveAPIView):
     """Get subscription details"""
     serializer_class = SubscriptionSerializer
     permission_classes = [IsAuthenticated]
@@ -46,3 +50,46 @@ class SubscriptionDetailView(generics.RetrieveAPIView):
     def get_queryset(self):
         customer = Customer.objects.get(user=self.request.user)
         return Subscription.objects.filter(customer=customer)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def product_availability(request, product_id):
+    """Is this product free for ?start_date=&end_date=[&quantity=]"""
+    serializer = AvailabilityQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        product = Product.objects.get(id=product_id, is_active=True)
+    except Product.DoesNotExist:
+        return Response({'error': 'Product not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    data = serializer.validated_data
+    return Response({
+        'product': str(product.id),
+        'start_date': data['start_date'],
+        'end_date': data['end_date'],
+        'available': is_available(product, data['start_date'], data['end_date'], data['quantity'])
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def available_product_list(request):
+    """Ids of active products (optionally in ?category=) free for ?start_date=&end_date="""
+    serializer = AvailabilityQuerySerializer(data=request.query_params)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    data = serializer.validated_data
+    products = Product.objects.filter(is_active=True)
+    if data.get('category'):
+        products = products.filter(category__slug=data['category'])
+    
+    free = available_products(products, data['start_date'], data['end_date'], data['quantity'])
+    return Response({
+        'start_date': data['start_date'],
+        'end_date': data['end_date'],
+        'products': [str(pk) for pk in free.values_list('id', flat=True)]
+    })
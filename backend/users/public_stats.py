@@ -0,0 +1,79 @@
+"""
+Cached homepage counters.
+
+The counters are kept in the default cache with two ages: after
+PUBLIC_STATS_REFRESH_SECONDS one request takes a short lock and recounts while
+everyone else keeps being served the cached numbers; the entry itself expires
+at PUBLIC_STATS_MAX_AGE, the staleness bound. A Celery beat task refreshes
+them ahead of both, so in steady state no request counts anything. Only a
+cold cache makes requests count, and then the lock lets one of them do it
+while the rest wait briefly for its result.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CACHE_KEY = 'public_stats'
+LOCK_KEY = 'public_stats:lock'
+LOCK_TIMEOUT = 30
+WAIT_SECONDS = 2
+WAIT_STEP = 0.05
+
+
+def count_stats():
+    from products.models import Product
+    from subscriptions.models import Subscription
+    from .models import User
+
+    return {
+        'total_users': User.objects.filter(is_active=True).count(),
+        'total_customers': User.objects.filter(role='customer', is_active=True).count(),
+        'total_vendors': User.objects.filter(role='vendor', is_active=True).count(),
+        'total_products': Product.objects.filter(is_active=True).count(),
+        'active_rentals': Subscription.objects.filter(status='active').count(),
+    }
+
+
+def refresh_stats():
+    """Recount and store the counters"""
+    stats = count_stats()
+    cache.set(
+        CACHE_KEY,
+        {'stats': stats, 'refresh_at': time.time() + settings.PUBLIC_STATS_REFRESH_SECONDS},
+        timeout=settings.PUBLIC_STATS_MAX_AGE,
+    )
+    return stats
+
+
+def _refresh_locked():
+    """Refresh under the lock; returns None when another process holds it"""
+    if not cache.add(LOCK_KEY, 1, timeout=LOCK_TIMEOUT):
+        return None
+    try:
+        return refresh_stats()
+    finally:
+        cache.delete(LOCK_KEY)
+
+
+def get_stats():
+    entry = cache.get(CACHE_KEY)
+    if entry is not None:
+        if time.time() >= entry['refresh_at']:
+            # Due for a refresh: one caller recounts, the rest serve the cached copy
+            return _refresh_locked() or entry['stats']
+        return entry['stats']
+
+    stats = _refresh_locked()
+    if stats is not None:
+        return stats
+    # Cold cache and someone else is counting: wait for their result
+    deadline = time.monotonic() + WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_STEP)
+        entry = cache.get(CACHE_KEY)
+        if entry is not None:
+            return entry['stats']
+    return refresh_stats()
@@ -2,8 +2,11 @@
 from rest_framework import serializers
 
 from .models import User
+from rentkart_backend.sparse_fields import SparseFieldsMixin
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+
+    field_dependencies = {'full_name': ('first_name', 'last_name', 'email')}
 
     full_name = serializers.CharField(read_only=True)
 
@@ -0,0 +1,9 @@
+from celery import shared_task
+
+from .public_stats import refresh_stats
+
+
+@shared_task
+def refresh_public_stats():
+    """Recount the homepage counters before they go stale"""
+    return refresh_stats()
@@ -11,6 +11,7 @@ from .serializers import (
 )
 from .models import User
 from customers.models import Customer
+from rentkart_backend.export import get_export_format, stream_export
 
 
 @api_view(['POST'])
@@ -169,7 +170,6 @@ def admin_stats(request):
         return Response({'error': 'Access denied'}, status=status.HTTP_403_FORBIDDEN)
     
     from subscriptions.models import Subscription
-    from payments.models import Payment
     from products.models import Product
     
     total_users = User.objects.count()
@@ -178,15 +178,11 @@ def admin_stats(request):
     total_products = Product.objects.count()
     active_rentals = Subscription.objects.filter(status='active').count()
     
-    # Calculate monthly revenue
+    # Monthly revenue, summed from the revenue ledger's hour and day buckets
     from django.utils import timezone
     from datetime import timedelta
-    thirty_days_ago = timezone.now() - timedelta(days=30)
-    monthly_payments = Payment.objects.filter(
-        status='success',
-        payment_date__gte=thirty_days_ago
-    )
-    monthly_revenue = sum(float(p.amount) for p in monthly_payments)
+    from payments.ledger import revenue
+    monthly_revenue = revenue(timezone.now() - timedelta(days=30))
     
     return Response({
         'total_users': total_users,
@@ -212,6 +208,10 @@ def admin_users_list(request):
     else:
         users = User.objects.all()
     
+    export_format = get_export_format(request)
+    if export_format:
+        return stream_export(users, UserSerializer, export_format, 'users', {'request': request})
+    
     serializer = UserSerializer(users, many=True)
     return Response(serializer.data)
 
@@ -247,6 +247,10 @@ def admin_all_products(request):
     from products.serializers import ProductDetailSerializer
     
     products = Product.objects.all()
+    export_format = get_export_format(request)
+    if export_format:
+        return stream_export(products, ProductDetailSerializer, export_format, 'products', {'request': request})
+    
     serializer = ProductDetailSerializer(products, many=True)
     return Response(serializer.data)
 
@@ -262,7 +266,11 @@ def admin_all_rentals(request):
     from subscriptions.serializers import SubscriptionSerializer
     
     subscriptions = Subscription.objects.all()
-    serializer = SubscriptionSerializer(subscriptions, many=True)
+    export_format = get_export_format(request)
+    if export_format:
+        return stream_export(subscriptions, SubscriptionSerializer, export_format, 'rentals', {'request': request})
+    
+    serializer = SubscriptionSerializer(subscriptions, many=True, context={'request': request})
     return Response(serializer.data)
 
 
@@ -277,6 +285,10 @@ def admin_all_payments(request):
     from payments.serializers import PaymentSerializer
     
     payments = Payment.objects.all()
+    export_format = get_export_format(request)
+    if export_format:
+        return stream_export(payments, PaymentSerializer, export_format, 'payments', {'request': request})
+    
     serializer = PaymentSerializer(payments, many=True)
     return Response(serializer.data)
 
@@ -306,19 +318,7 @@ def remove_profile_picture(request):
 @permission_classes([AllowAny])
 def public_stats(request):
     """Public stats for homepage - no authentication required"""
-    from products.models import Product
-    from subscriptions.models import Subscription
+    from .public_stats import get_stats
     
-    total_users = User.objects.filter(is_active=True).count()
-    total_customers = User.objects.filter(role='customer', is_active=True).count()
-    total_vendors = User.objects.filter(role='vendor', is_active=True).count()
-    total_products = Product.objects.filter(is_active=True).count()
-    active_rentals = Subscription.objects.filter(status='active').count()
-    
-    return Response({
-        'total_users': total_users,
-        'total_customers': total_customers,
-        'total_vendors': total_vendors,
-        'total_products': total_products,
-        'active_rentals': active_rentals
-    })
+    # Served from the cache; see users.public_stats for the staleness bound
+    return Response(get_stats())
@@ -354,6 +354,13 @@ import { GoogleMapsService } from '../../core/services/google-maps.service';
                     </tbody>
                   </table>
                 </div>
+
+                <div *ngIf="invoicesNext" class="text-center mt-6">
+                  <button (click)="loadMoreInvoices()" [disabled]="loadingMoreInvoices"
+                          class="px-6 py-3 bg-blue-100 text-blue-700 rounded-lg hover:bg-blue-200 font-semibold disabled:opacity-50">
+                    {{ loadingMoreInvoices ? 'Loading...' : 'Load more invoices' }}
+                  </button>
+                </div>
               </div>
 
               <div *ngIf="!loadingInvoices && invoices.length === 0" class="text-center py-16">
@@ -631,6 +638,9 @@ export class DashboardComponent implements OnInit, AfterViewInit {
   loadingRentals = true;
   loadingAddresses = false;
   loadingInvoices = false;
+  // Cursor URL of the next page of invoices, if there is one
+  invoicesNext: string | null = null;
+  loadingMoreInvoices = false;
   updatingProfile = false;
   savingAddress = false;
   removingPicture = false;
@@ -745,9 +755,10 @@ export class DashboardComponent implements OnInit, AfterViewInit {
 
   loadInvoices() {
     this.loadingInvoices = true;
-    this.http.get<any[]>(`${environment.apiUrl}/payments/invoices/`).subscribe({
-      next: (invoices) => {
-        this.invoices = invoices;
+    this.http.get<any>(`${environment.apiUrl}/payments/invoices/`).subscribe({
+      next: (response) => {
+        this.invoices = Array.isArray(response) ? response : (response.results || []);
+        this.invoicesNext = response.next || null;
         this.loadingInvoices = false;
       },
       error: (err) => {
@@ -757,6 +768,22 @@ export class DashboardComponent implements OnInit, AfterViewInit {
     });
   }
 
+  loadMoreInvoices() {
+    if (!this.invoicesNext || this.loadingMoreInvoices) return;
+    this.loadingMoreInvoices = true;
+    this.http.get<any>(this.invoicesNext).subscribe({
+      next: (response) => {
+        this.invoices = [...this.invoices, ...(response.results || [])];
+        this.invoicesNext = response.next || null;
+        this.loadingMoreInvoices = false;
+      },
+      error: (err) => {
+        console.error('Error loading invoices:', err);
+        this.loadingMoreInvoices = false;
+      }
+    });
+  }
+
   updateProfile() {
     if (this.profileForm.valid) {
       this.updatingProfile = true;
@@ -452,14 +452,16 @@ export class HomeComponent implements OnInit {
 
   loadFeaturedProducts() {
     this.loadingProducts = true;
-    this.http.get<any[]>(`${environment.apiUrl}/products/?is_featured=true`).subscribe({
-      next: (products) => {
+    this.http.get<any>(`${environment.apiUrl}/products/?is_featured=true&page_size=4`).subscribe({
+      next: (response) => {
+        const products = Array.isArray(response) ? response : (response.results || []);
         this.featuredProducts = products.slice(0, 4);
         this.loadingProducts = false;
       },
       error: () => {
-        this.http.get<any[]>(`${environment.apiUrl}/products/`).subscribe({
-          next: (products) => {
+        this.http.get<any>(`${environment.apiUrl}/products/?page_size=4`).subscribe({
+          next: (response) => {
+            const products = Array.isArray(response) ? response : (response.results || []);
             this.featuredProducts = products.slice(0, 4);
             this.loadingProducts = false;
           }
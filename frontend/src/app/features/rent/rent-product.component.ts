@@ -1,10 +1,10 @@
-import { Component, OnInit } from '@angular/core';
+import { Component, OnDestroy, OnInit } from '@angular/core';
 import { CommonModule } from '@angular/common';
 import { FormBuilder, FormGroup, ReactiveFormsModule, Validators } from '@angular/forms';
 import { FormsModule } from '@angular/forms';
 import { ActivatedRoute, Router, RouterModule } from '@angular/router';
 import { ProductService } from '../../core/services/product.service';
-import { HttpClient } from '@angular/common/http';
+import { HttpClient, HttpHeaders } from '@angular/common/http';
 import { environment } from '../../../environments/environment';
 import { ToastService } from '../../core/services/toast.service';
 import { InrCurrencyPipe } from '../../shared/pipes/currency.pipe';
@@ -412,7 +412,7 @@ import { InrCurrencyPipe } from '../../shared/pipes/currency.pipe';
     </div>
   `
 })
-export class RentProductComponent implements OnInit {
+export class RentProductComponent implements OnInit, OnDestroy {
   product: any = null;
   rentalForm: FormGroup;
   loading = false;
@@ -428,6 +428,11 @@ export class RentProductComponent implements OnInit {
   createdSubscriptionId: string | null = null;
   invoiceData: any = null;
   paymentData: any = null;
+  // Sent as Idempotency-Key until the attempt has a final outcome, so
+  // retrying after a lost response can't charge twice
+  private paymentKey: string | null = null;
+  private paymentPoll: any = null;
+  private paymentPolls = 0;
 
   paymentMethods = [
     { value: 'upi', label: 'UPI', icon: '📱', description: 'Google Pay, PhonePe, Paytm' },
@@ -467,6 +472,10 @@ export class RentProductComponent implements OnInit {
     }
   }
 
+  ngOnDestroy() {
+    clearTimeout(this.paymentPoll);
+  }
+
   loadProduct(slug: string) {
     this.productService.getProductDetail(slug).subscribe({
       next: (product) => {
@@ -563,39 +572,72 @@ getTotalAmount(): number {
     if (!this.selectedPaymentMethod || !this.createdSubscriptionId) return;
 
     this.processingPayment = true;
+    this.paymentPolls = 0;
+    this.paymentKey = this.paymentKey || crypto.randomUUID();
 
     const paymentData = {
       subscription_id: this.createdSubscriptionId,
       payment_method: this.selectedPaymentMethod
     };
+    const headers = new HttpHeaders({ 'Idempotency-Key': this.paymentKey });
 
-    setTimeout(() => {
-      this.http.post(`${environment.apiUrl}/payments/process/`, paymentData).subscribe({
-        next: (response: any) => {
-          this.processingPayment = false;
-          if (response.success) {
-            this.paymentSuccess = true;
-            this.invoiceData = response.invoice;
-            this.paymentData = response.payment;
-            this.toastService.success('🎉 Payment successful!');
-          } else {
-            this.paymentFailed = true;
-            this.paymentError = response.message || 'Payment failed. Please try again.';
-          }
-        },
-        error: (err) => {
-          this.processingPayment = false;
-          this.paymentFailed = true;
-          this.paymentError = 'Payment processing failed. Please try again.';
-        }
-      });
-    }, 2000);
+    this.http.post(`${environment.apiUrl}/payments/process/`, paymentData, { headers }).subscribe({
+      next: (response: any) => this.handlePaymentResult(response),
+      error: (err) => this.handlePaymentError(err)
+    });
+  }
+
+  private handlePaymentResult(response: any) {
+    if (response.success === null) {
+      // Still with the gateway: poll until the payment is final
+      if (++this.paymentPolls > 40) {
+        this.processingPayment = false;
+        this.paymentFailed = true;
+        this.paymentError = 'Payment is taking longer than usual. Retry to check its status.';
+        return;
+      }
+      this.paymentPoll = setTimeout(() => {
+        this.http.get(`${environment.apiUrl}/payments/${response.payment.id}/status/`).subscribe({
+          next: (status: any) => this.handlePaymentResult(status),
+          error: (err) => this.handlePaymentError(err)
+        });
+      }, 1500);
+      return;
+    }
+
+    this.processingPayment = false;
+    this.paymentKey = null;
+    if (response.success) {
+      this.paymentSuccess = true;
+      this.invoiceData = response.invoice;
+      this.paymentData = response.payment;
+      this.toastService.success('🎉 Payment successful!');
+    } else {
+      this.paymentFailed = true;
+      this.paymentError = response.message || 'Payment failed. Please try again.';
+    }
+  }
+
+  private handlePaymentError(err: any) {
+    if (err.error?.success === false) {
+      // A declined payment is final
+      this.handlePaymentResult(err.error);
+      return;
+    }
+    this.processingPayment = false;
+    this.paymentFailed = true;
+    this.paymentError = 'Payment processing failed. Please try again.';
   }
 
   retryPayment() {
     this.paymentFailed = false;
     this.paymentError = '';
-    this.selectedPaymentMethod = '';
+    if (this.paymentKey) {
+      // The last attempt has no outcome yet: resend it with the same key
+      this.processPayment();
+    } else {
+      this.selectedPaymentMethod = '';
+    }
   }
 
   viewInvoice() {